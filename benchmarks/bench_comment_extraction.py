@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+"""
+Compare the single-pass comment extractor with the old multi-pass one
+on a word page with hundreds of comments.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bs4 import BeautifulSoup, Comment  # noqa: E402
+
+from fixture_server import word_page  # noqa: E402
+from wordnik_comment_scraper import (  # noqa: E402
+    extract_comment,
+    fix_relative_links,
+)
+
+
+def legacy_extract(comment, user=None):
+    """The extraction in scrape_word_comments before the single pass"""
+    if user:
+        span_author = comment.find_all("span", class_="author")[0]
+        a = span_author.find_all("a", href=True)[0]
+        if not "/users/" + user == a["href"].lower():
+            return None
+
+    body = comment.find_all("div", class_="body")[0]
+    for a in body.find_all("a", "report_comment"):
+        a.extract()
+    for html_comment in body.find_all(string=lambda text: isinstance(text, Comment)):
+        html_comment.extract()
+    return fix_relative_links(body, "https://www.wordnik.com")
+
+
+def parse(page):
+    soup = BeautifulSoup(page, "lxml")
+    return soup.find(id="commentsOnWord").find_all("li", class_="comment")
+
+
+def extract_all(comments, extract, user):
+    return [str(body) for body in (extract(c, user) for c in comments) if body]
+
+
+def time_extraction(page, extract, user, repeat):
+    """Return the fastest time to extract all comments, not counting parsing"""
+    times = []
+    for _ in range(repeat):
+        comments = parse(page)
+        start = time.perf_counter()
+        for comment in comments:
+            extract(comment, user)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare the single-pass and multi-pass comment extractors.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("-n", "--comments", type=int, default=500, help="Comments")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="Timing runs")
+    args = parser.parse_args()
+
+    text = (
+        '<b>word</b>, <i>n.</i></p><p><a href="/words/word">'
+        "<i>Source</i>, 1 January 2018</a>:</p><blockquote>A quote with "
+        '<a href="https://example.com/">a link</a> and <b>word</b>.</blockquote><p>'
+    )
+    users = ["hugovk", "someone", "someone-else"]
+    comments = [(users[i % len(users)], text) for i in range(args.comments)]
+    page = word_page("word", *comments)
+
+    for user in ("hugovk", None):
+        assert extract_all(parse(page), extract_comment, user) == extract_all(
+            parse(page), legacy_extract, user
+        )
+
+    extractors = [("multi-pass", legacy_extract), ("single-pass", extract_comment)]
+    for name, extract in extractors:
+        for user in ("hugovk", None):
+            best = time_extraction(page, extract, user, args.repeat)
+            print(f"{name:>11} user={str(user):6}: {best * 1000:8.1f} ms")
+
+# End of file
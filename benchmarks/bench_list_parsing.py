@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+"""
+Compare the list page parsers on a synthetic list.
+"""
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fixture_server import list_page  # noqa: E402
+from wordnik_list_scraper import PARSERS, parse_list_page  # noqa: E402
+
+
+def peak_memory(function):
+    """Return peak Python memory allocated while running function, in bytes"""
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare the list page parsers on a synthetic list.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("-n", "--words", type=int, default=10000, help="List size")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="Timing runs")
+    args = parser.parse_args()
+
+    words = [f"word{i}" for i in range(args.words)]
+    page = list_page("Synthetic", words).encode("utf-8")
+    print(f"{args.words} words, {len(page) / 1024:.0f} KiB page")
+
+    for name in PARSERS:
+        times = timeit.repeat(
+            lambda: parse_list_page(page, name), number=1, repeat=args.repeat
+        )
+        peak = peak_memory(lambda: parse_list_page(page, name))
+        print(f"{name:>5}: {min(times) * 1000:8.1f} ms  {peak / 1024:8.0f} KiB peak")
+
+# End of file
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+"""
+Time sorting a million words: the old str.lower() key, collation keys with
+a cold and a warm cache, and the external merge sort through files.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import wordnik_sort  # noqa: E402
+
+LETTERS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZéèçñöÉ"
+
+
+def make_words(count):
+    rng = random.Random(0)
+    return [
+        "".join(rng.choice(LETTERS) for _ in range(rng.randrange(3, 12)))
+        for _ in range(count)
+    ]
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Time sorting many words.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("-n", "--words", type=int, default=1_000_000, help="Words")
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=wordnik_sort.CHUNK_SIZE // 5,
+        help="Words per chunk for the external sort",
+    )
+    args = parser.parse_args()
+
+    words = make_words(args.words)
+    lower = timed(lambda w: sorted(w, key=lambda s: s.lower()), words)
+    print(f"  str.lower: {lower:6.2f} s")
+    print(f"       cold: {timed(wordnik_sort.sort_words, words):6.2f} s")
+    print(f"       warm: {timed(wordnik_sort.sort_words, words):6.2f} s")
+
+    wordnik_sort.collation_key.cache_clear()
+    wordnik_sort.fold.cache_clear()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        infile = os.path.join(tmpdir, "words.txt")
+        with open(infile, "w", encoding="utf-8") as f:
+            f.writelines(word + "\n" for word in words)
+        outfile = os.path.join(tmpdir, "sorted.txt")
+        external = timed(wordnik_sort.sort_file, infile, outfile, args.chunk_size)
+    print(f"   external: {external:6.2f} s ({args.chunk_size} words per chunk)")
+
+# End of file
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+"""
+Time resolving sources for a batch of URLs: the old source_from_url from
+cit.py, the resolver without its cache, and the resolver cold and warm.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import url_sources  # noqa: E402
+
+HOSTS = [
+    "www.nytimes.com",
+    "www.washingtonpost.com",
+    "twitter.com",
+    "www.bikeradar.com",
+    "www.theguardian.com",
+    "www.bbc.co.uk",
+    "example.org",
+]
+
+
+def make_urls(count, hosts):
+    rng = random.Random(0)
+    return [
+        f"https://{rng.choice(hosts)}/user{rng.randrange(1000)}/status/{i}"
+        for i in range(count)
+    ]
+
+
+def old_source_from_url(url):
+    """cit.source_from_url before url_sources, with the same offline
+    extractor so the comparison doesn't include fetching the suffix list"""
+    if "nytimes.com" in url:
+        return "The New York Times"
+    elif "washingtonpost.com" in url:
+        return "Washington Post"
+    elif "bikeradar.com" in url:
+        return "BikeRadar"
+    elif url.startswith("https://twitter.com"):
+        username = url.lstrip("https://twitter.com")
+        return "@" + username[: username.index("/")]
+
+    output = url_sources.suffix_extractor()(url).domain
+    if output.startswith("the"):
+        output = "The " + output[3:]
+    return output.title()
+
+
+def timed(resolve, urls):
+    start = time.perf_counter()
+    for url in urls:
+        resolve(url)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Time source resolution for many URLs.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("-n", "--urls", type=int, default=100_000, help="URLs")
+    parser.add_argument("--hosts", type=int, default=1000, help="Distinct hosts")
+    args = parser.parse_args()
+
+    hosts = HOSTS + [f"site{i}.example.com" for i in range(args.hosts - len(HOSTS))]
+    urls = make_urls(args.urls, hosts)
+
+    start = time.perf_counter()
+    url_sources.suffix_extractor()("example.com")
+    print(f"suffix list: {(time.perf_counter() - start) * 1000:7.1f} ms")
+
+    print(f"        old: {timed(old_source_from_url, urls) * 1000:7.1f} ms")
+    uncached = url_sources.SourceResolver(cache_size=0)
+    print(f"   uncached: {timed(uncached.resolve, urls) * 1000:7.1f} ms")
+    resolver = url_sources.SourceResolver()
+    print(f"      first: {timed(resolver.resolve, urls) * 1000:7.1f} ms")
+    print(f"       warm: {timed(resolver.resolve, urls) * 1000:7.1f} ms")
+    print(resolver.for_netloc.cache_info())
+
+# End of file
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+"""
+Compare time to download a list with and without a cached auth token,
+against a local mock of the API with a slow login.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import wordnik_api  # noqa: E402
+from fixture_server import FixtureServer, MockApi  # noqa: E402
+
+CREDENTIALS = {
+    "wordnik_username": "hugovk",
+    "wordnik_password": "secret",
+    "wordnik_api_key": "test-key",
+}
+
+
+def timed_download(base_url, token_cache):
+    start = time.perf_counter()
+    asyncio.run(
+        wordnik_api.download(CREDENTIALS, ["words"], base_url, token_cache=token_cache)
+    )
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare runs with and without a cached auth token.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--login-latency", type=float, default=0.3, help="Seconds per login"
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="Runs of each")
+    args = parser.parse_args()
+
+    api = MockApi({"words": ["word"] * 100}, login_latency=args.login_latency)
+    with FixtureServer(api.pages()) as server, tempfile.TemporaryDirectory() as tmp:
+        base_url = server.url + "/v4"
+        token_cache = wordnik_api.TokenCache(os.path.join(tmp, "token.json"))
+        uncached = [timed_download(base_url, None) for _ in range(args.repeat)]
+        timed_download(base_url, token_cache)  # Prime the cache
+        cached = [timed_download(base_url, token_cache) for _ in range(args.repeat)]
+
+    print(f"uncached: {min(uncached) * 1000:7.1f} ms")
+    print(f"  cached: {min(cached) * 1000:7.1f} ms")
+
+# End of file
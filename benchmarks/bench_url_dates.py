@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+"""
+Compare extracting dates from a list of URLs with the fast-path patterns
+against fuzzy parsing every URL with dateutil.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+from dateutil.parser import parse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import url_dates  # noqa: E402
+
+TEMPLATES = [
+    "https://www.washingtonpost.com/news/wp/{y}/{m:02}/{d:02}/story-{i}/",
+    "https://www.theguardian.com/science/{y}/{mon}/{d:02}/story-{i}",
+    "https://example.com/news/{y}{m:02}{d:02}-story-{i}",
+    "https://twitter.com/someone/status/{snowflake}",
+]
+MONTHS = list(url_dates.MONTHS)
+
+
+def make_urls(count):
+    rng = random.Random(0)
+    urls = []
+    for i in range(count):
+        y, m, d = rng.randrange(2011, 2020), rng.randrange(1, 13), rng.randrange(1, 29)
+        snowflake = rng.randrange(2**60, 2**61)
+        urls.append(
+            rng.choice(TEMPLATES).format(
+                y=y, m=m, d=d, mon=MONTHS[m - 1], i=i, snowflake=snowflake
+            )
+        )
+    return urls
+
+
+def fuzzy(url):
+    try:
+        return parse(url, fuzzy=True)
+    except (ValueError, OverflowError):
+        return None
+
+
+def timed(function, urls):
+    start = time.perf_counter()
+    for url in urls:
+        function(url)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Time date extraction from many URLs.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("-n", "--urls", type=int, default=20_000, help="URLs")
+    args = parser.parse_args()
+
+    urls = make_urls(args.urls)
+    print(f"  dateutil: {timed(fuzzy, urls) * 1000:8.1f} ms")
+    print(f" fast path: {timed(url_dates.date_from_url, urls) * 1000:8.1f} ms")
+    print(f"    cached: {timed(url_dates.date_from_url, urls) * 1000:8.1f} ms")
+
+# End of file
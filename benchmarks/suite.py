@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+"""
+Benchmark scraping, parsing, sorting and HTML rendering on synthetic pages
+served from localhost, and save the timings as JSON to compare across commits.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import wordnik_comment_scraper  # noqa: E402
+import wordnik_http  # noqa: E402
+import wordnik_list_scraper  # noqa: E402
+from fixture_server import FixtureServer, list_page, word_page  # noqa: E402
+
+SIZES = [100, 1000, 10000, 100000]
+
+
+def synthetic_words(size, seed=0):
+    """Return size distinct words in mixed case, in random order"""
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyzé"
+    words = set()
+    while len(words) < size:
+        word = "".join(rng.choice(letters) for _ in range(rng.randint(3, 12)))
+        words.add(word.capitalize() if rng.random() < 0.2 else word)
+    return sorted(words, key=lambda word: rng.random())
+
+
+def comment_text(word):
+    return (
+        f'<b>{word}</b>, <i>n.</i></p><p><a href="/words/{word}">'
+        f"<i>Source</i>, 1 January 2018</a>:</p><blockquote>A quote with "
+        f"<b>{word}</b> in it.</blockquote><p>"
+    )
+
+
+def time_it(function, repeat):
+    times = timeit.repeat(function, number=1, repeat=repeat)
+    return {"min": min(times), "mean": statistics.mean(times), "repeat": repeat}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except OSError:
+        return None
+
+
+def benchmarks(size, server):
+    """Yield (name, function) for each benchmark at one size"""
+    words = synthetic_words(size)
+
+    for parser in wordnik_list_scraper.PARSERS:
+        yield f"scrape_list[{parser}]", lambda parser=parser: (
+            wordnik_list_scraper.scrape_list(
+                f"list{size}", base_url=server.url, parser=parser
+            )
+        )
+
+    # A word with a tenth as many comments as the list has words
+    yield "scrape_word_comments", lambda: wordnik_comment_scraper.scrape_word_comments(
+        f"word{size}", "hugovk", base_url=server.url
+    )
+
+    yield "sort_words", lambda: wordnik_list_scraper.sort_words(words)
+
+    comments = [f'<div class="body"><p>{comment_text(w)}</p></div>' for w in words]
+
+    def render():
+        f = io.StringIO()
+        wordnik_comment_scraper.print_html_header(
+            "hugovk", "list", "Title", "Subtitle", file=f
+        )
+        wordnik_comment_scraper.print_html_index(words, file=f)
+        for word, comment in zip(words, comments):
+            f.write(wordnik_comment_scraper.format_word_section(word, [comment]))
+        wordnik_comment_scraper.print_html_footer(file=f)
+
+    yield "render_html", render
+
+
+def run(sizes, repeat, pattern=None):
+    """Return a list of results for every benchmark at every size"""
+    wordnik_http.cache = None
+    wordnik_http.offline = False
+    wordnik_http.rate_limiter.interval = 0
+
+    pages = {}
+    for size in sizes:
+        words = synthetic_words(size)
+        pages[f"/lists/list{size}"] = list_page("Synthetic", words)
+        comments = [("hugovk", comment_text(w)) for w in words[: max(size // 10, 1)]]
+        pages[f"/words/word{size}"] = word_page(f"word{size}", *comments)
+
+    results = []
+    with FixtureServer(pages) as server:
+        for size in sizes:
+            for name, function in benchmarks(size, server):
+                if pattern and pattern not in name:
+                    continue
+                with contextlib.redirect_stdout(sys.stderr):
+                    result = time_it(function, repeat)
+                result.update(name=name, size=size)
+                results.append(result)
+                print(f"{name:>24} {size:>7}: {result['min'] * 1000:10.2f} ms")
+    return results
+
+
+def compare(old_results, new_results):
+    """Print the change in minimum time for benchmarks in both runs"""
+    old = {(r["name"], r["size"]): r["min"] for r in old_results}
+    for result in new_results:
+        key = (result["name"], result["size"])
+        if key in old:
+            ratio = result["min"] / old[key]
+            print(f"{key[0]:>24} {key[1]:>7}: {ratio:6.2f}x old time")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark scraping, parsing, sorting and HTML rendering.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "-s",
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=SIZES,
+        help="Number of words in the synthetic lists",
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Timing runs")
+    parser.add_argument("-k", "--filter", help="Only run benchmarks with this in name")
+    parser.add_argument(
+        "-o", "--output", default="bench_output.json", help="Save results to this"
+    )
+    parser.add_argument("-c", "--compare", help="Compare with an earlier output")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat, args.filter)
+    with open(args.output, "w") as f:
+        json.dump(
+            {
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f)["results"], results)
+
+# End of file
@@ -11,18 +11,20 @@ Make a citation for Wordnik.
 5. Asks to save the cited URL to the Internet Archive because linkrot
 """
 import argparse
+import csv
+import json
 from sys import platform as _platform
-from dateutil.parser import parse  # pip install python-dateutil
-from dateutil.relativedelta import relativedelta
 
 import datetime
+import functools
 import re
-import subprocess
 import sys
-import webbrowser
 
-# https://github.com/hugovk/word-tools/blob/master/word_tools.py
-import word_tools
+import wordnik_daemon
+import wordnik_profile
+
+# Heavier modules such as dateutil, webbrowser and word_tools
+# are imported where needed, to keep startup quick
 
 # from pprint import pprint
 
@@ -35,6 +37,8 @@ def print_it(text):
 def write_to_clipboard(text):
 
     if _platform == "darwin":
+        import subprocess
+
         process = subprocess.Popen(
             "pbcopy", env={"LANG": "en_US.UTF-8"}, stdin=subprocess.PIPE
         )
@@ -94,6 +98,9 @@ def today_timestamp():
 def parse_now_or_past(timestr):
     """Parse a timestring. If no year given, return a date that's today or in
     the past"""
+    from dateutil.parser import parse  # pip install python-dateutil
+    from dateutil.relativedelta import relativedelta
+
     indate = parse(timestr, dayfirst=True, yearfirst=False)
     indate = indate.date()
     now = datetime.datetime.now().date()
@@ -116,45 +123,179 @@ def validate_date(timestr):
     return format_d_mon_yyyy(date)
 
 
+@functools.lru_cache(maxsize=1024)
+def embolden_pattern(*words):
+    """Return a compiled case-insensitive regex matching any of the words"""
+    # Longest first, so a phrase wins over a word inside it
+    words = sorted(words, key=len, reverse=True)
+    return re.compile("(" + "|".join(re.escape(word) for word in words) + ")", re.I)
+
+
 def embolden(word, quote):
     """Make word bold in quote, regardless of but maintaining case"""
-    return re.sub(r"(" + word + r")", r"<b>\1</b>", quote, flags=re.I)
+    return embolden_pattern(word).sub(r"<b>\1</b>", quote)
+
+
+def embolden_many(words, quotes):
+    """Make any of the words bold in each of the quotes, with one pass over
+    each quote"""
+    words = tuple(sorted({word for word in words if word}))
+    if not words:
+        return list(quotes)
+    pattern = embolden_pattern(*words)
+    return [pattern.sub(r"<b>\1</b>", quote) for quote in quotes]
 
 
 def source_from_url(url):
     """Get the source form the URL"""
+    import url_sources
 
-    if "nytimes.com" in url:
-        return "The New York Times"
-    elif "washingtonpost.com" in url:
-        return "Washington Post"
-    elif "bikeradar.com" in url:
-        return "BikeRadar"
-    elif url.startswith("https://twitter.com"):
-        username = url.lstrip("https://twitter.com")
-        first_slash = username.index("/")
-        username = username[:first_slash]
-        return "@" + username
+    return url_sources.source_from_url(url)
 
-    import tldextract  # pip install tldextract
 
-    ext = tldextract.extract(url)
-    output = ext.domain
+def date_from_url(url):
+    """Get the date form the URL"""
+    import url_dates
+
+    date = url_dates.date_from_url(url)
+    return format_d_mon_yyyy(date) if date else None
+
+
+def format_citation(
+    word,
+    pos=None,
+    defn=None,
+    quote=None,
+    url=None,
+    source=None,
+    date=None,
+    source_roman=False,
+):
+    """Return the citation marked up with HTML for a Wordnik comment"""
+    # Format a little something like this:
 
-    if output.startswith("the"):
-        output = "The " + output[3:]
+    # <b>spinning rust</b>, <i>n.</i> A computer hard disk, specifically one
+    # using magnetic storage, as opposed to a solid-state drive (SSD).
 
-    return output.title()
+    # <a href="https://twitter.com/wiredfool/status/577541476214706176">erics,
+    # 16 March 2015</a>:
 
+    # <blockquote>Apparently it wrote those 11gigs _after_ I moved 10 gigs of
+    # email archives to <b>spinning rust</b> this morning.</blockquote>
 
-def date_from_url(url):
-    """Get the date form the URL"""
-    try:
-        date = parse(url, fuzzy=True)
-        return format_d_mon_yyyy(date)
-    except (ValueError, OverflowError):
-        return None
-    return None
+    # Line 1
+    text = ""
+    line = ""
+    if word:
+        line += "<b>" + word + "</b>"
+    if pos:
+        if len(line) > 0:
+            line += ", "
+        line += "<i>" + pos + "</i>"
+    if defn:
+        if len(line) > 0:
+            line += " "
+        line += defn
+    if len(line) > 0:
+        text += line + "\n\n"
+
+    # Line 2
+    line = ""
+    if url:
+        line += '<a href="' + url + '">'
+    if source:
+        if source_roman:
+            line += source
+        else:
+            line += "<i>" + source + "</i>"
+    if date:
+        line += ", " + validate_date(date)
+    else:
+        line += ", " + today_timestamp()
+    if url:
+        line += "</a>"
+    if len(line) > 0:
+        line += ":"
+        text += line + "\n\n"
+
+    # Line 3
+    line = ""
+    if quote:
+        if word:
+            quote = embolden(word, quote)
+        line = "<blockquote>" + quote + "</blockquote>"
+        text += line + "\n\n"
+
+    return text
+
+
+def read_citations(filename):
+    """Read citations from a JSONL file, or a CSV file with a header row.
+    Fields are word, pos, defn, quote, url, source, date, source_roman
+    and list, all optional except word"""
+    with open(filename, encoding="utf-8", newline="") as f:
+        if filename.endswith((".jsonl", ".json")):
+            return [json.loads(line) for line in f if line.strip()]
+        return list(csv.DictReader(f))
+
+
+def fill_from_urls(citations, concurrency=8):
+    """Fill in missing sources and dates from the citations' URLs,
+    looking up several at once"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    def fill(citation):
+        url = citation.get("url")
+        if url and not citation.get("source"):
+            with wordnik_profile.span("source", url=url):
+                citation["source"] = source_from_url(url)
+        if url and not citation.get("date"):
+            with wordnik_profile.span("date", url=url):
+                citation["date"] = date_from_url(url)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(fill, citations))
+
+
+def format_citations(citations, default_pos="n."):
+    """Return a list of formatted citations"""
+    with wordnik_profile.span("render", citations=len(citations)):
+        return _format_citations(citations, default_pos)
+
+
+def _format_citations(citations, default_pos):
+    return [
+        format_citation(
+            citation["word"],
+            citation.get("pos") or default_pos,
+            citation.get("defn"),
+            citation.get("quote"),
+            citation.get("url"),
+            citation.get("source"),
+            citation.get("date"),
+            str(citation.get("source_roman", "")).lower() in ("1", "true", "yes"),
+        )
+        for citation in citations
+    ]
+
+
+def cite_all(citations, default_pos="n."):
+    """Fill in sources and dates from URLs and return the formatted
+    citations, using the daemon if it's running"""
+    if wordnik_daemon.client:
+        return wordnik_daemon.client.cite(citations, default_pos)
+    fill_from_urls(citations)
+    return format_citations(citations, default_pos)
+
+
+def words_by_list(citations, default_list):
+    """Return a dict of list permalink: words to add to it"""
+    lists = {}
+    for citation in citations:
+        words = lists.setdefault(citation.get("list") or default_list, [])
+        if citation["word"] not in words:
+            words.append(citation["word"])
+    return lists
 
 
 # http://stackoverflow.com/a/23085282/724176
@@ -173,6 +314,7 @@ if __name__ == "__main__":
     )
     parser.add_argument(
         "word",
+        nargs="?",
         type=commandline_arg,
         help="Word to cite, will be bolded if found in quote",
     )
@@ -199,76 +341,60 @@ if __name__ == "__main__":
         default="new-to-me--2019",
         help="Permalink of the Wordnik list to post to",
     )
+    parser.add_argument(
+        "-b",
+        "--batch",
+        help="Format all the citations in this CSV or JSONL file without asking, "
+        "and add their words to Wordnik",
+    )
+    parser.add_argument(
+        "-o", "--outfile", help="Save batch citations to this file. Default: stdout"
+    )
+    parser.add_argument(
+        "--no-post", action="store_true", help="Don't add batch words to Wordnik"
+    )
+    wordnik_daemon.add_arguments(parser)
+    wordnik_profile.add_arguments(parser)
     args = parser.parse_args()
-
-    # Format a little something like this:
-
-    # <b>spinning rust</b>, <i>n.</i> A computer hard disk, specifically one
-    # using magnetic storage, as opposed to a solid-state drive (SSD).
-
-    # <a href="https://twitter.com/wiredfool/status/577541476214706176">erics,
-    # 16 March 2015</a>:
-
-    # <blockquote>Apparently it wrote those 11gigs _after_ I moved 10 gigs of
-    # email archives to <b>spinning rust</b> this morning.</blockquote>
+    wordnik_profile.configure(args)
+
+    import webbrowser
+
+    # https://github.com/hugovk/word-tools/blob/master/word_tools.py
+    import word_tools
+
+    if args.batch:
+        import wordnik_output
+
+        wordnik_daemon.connect(args)
+        citations = read_citations(args.batch)
+        texts = cite_all(citations, args.pos)
+        with wordnik_output.open_output(args.outfile) as f:
+            for text in texts:
+                f.write(text)
+        if not args.no_post:
+            for wordlist, words in words_by_list(citations, args.list).items():
+                print(f"Post {len(words)} words to {wordlist} on Wordnik")
+                word_tools.add_to_wordnik(words, wordlist)
+        sys.exit()
+    elif not args.word:
+        parser.error("Please give a word, or a --batch file")
 
     print()
 
-    if args.url and not args.source:
-        args.source = source_from_url(args.url)
-
-    if args.url and not args.date:
-        args.date = date_from_url(args.url)
-
-    # Line 1
-    text = ""
-    line = ""
-    if args.word:
-        line += "<b>" + args.word + "</b>"
-    if args.pos:
-        if len(line) > 0:
-            line += ", "
-        line += "<i>" + args.pos + "</i>"
-    if args.defn:
-        if len(line) > 0:
-            line += " "
-        line += args.defn
-    if len(line) > 0:
-        print(line)
-        print()
-        text += line + "\n\n"
-
-    # Line 2
-    line = ""
-    if args.url:
-        line += '<a href="' + args.url + '">'
-    if args.source:
-        if args.source_roman:
-            line += args.source
-        else:
-            line += "<i>" + args.source + "</i>"
-    if args.date:
-        line += ", " + validate_date(args.date)
-    else:
-        line += ", " + today_timestamp()
-    if args.url:
-        line += "</a>"
-    if len(line) > 0:
-        line += ":"
-        print(line)
-        print()
-        text += line + "\n\n"
-
-    # Line 3
-    line = ""
-    if args.quote:
-        quote = args.quote
-        if args.word:
-            quote = embolden(args.word, quote)
-        line = "<blockquote>" + quote + "</blockquote>"
-        print(line)
-        print()
-        text += line + "\n\n"
+    wordnik_daemon.connect(args)
+    citation = {
+        "word": args.word,
+        "pos": args.pos,
+        "defn": args.defn,
+        "quote": args.quote,
+        "url": args.url,
+        "source": args.source,
+        "date": args.date,
+        "source_roman": args.source_roman,
+    }
+    text = cite_all([citation], args.pos)[0]
+    print(text, end="")
 
     if args.list:
         answer = query_yes_no(
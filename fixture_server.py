@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+"""
+Local HTTP stand-in for wordnik.com, used by the unit tests.
+"""
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+
+def word_page(word, *comments):
+    """Return a minimal Wordnik word page with (user, text) comments"""
+    items = "".join(
+        f"""<li class="comment">
+<div class="body">
+<p class="byline">
+<span class="author"><a href="/users/{user}">{user}</a></span> commented on the word
+<a href="/words/{word}">{word}</a>
+</p>
+<p class="body">{text}</p>
+<a class="report_comment" href="#">report</a>
+<!-- you won't flag your own comments as spam -->
+<p class="meta">
+<span class="date">
+<abbr class="relative" title="August 3, 2018">August 3, 2018</abbr>
+</span>
+</p>
+</div>
+</li>"""
+        for user, text in comments
+    )
+    return f"""<html><body>
+<ul id="commentsOnWord">{items}</ul>
+</body></html>"""
+
+
+def list_page(title, words, lists=2, user="hugovk", next_href=None):
+    """Return a minimal Wordnik list page.
+    "words" is a list of words, or a dict of word: number of lists.
+    "next_href" links to the next page of the list"""
+    if not isinstance(words, dict):
+        words = dict.fromkeys(words, lists)
+    items = "".join(
+        f"""<li class="word"><a href="/words/{word}">{word}</a>
+  <span class="popular" style="display:none">and appears on
+      <a href="/words/{word}#lists">{count}</a> lists</span>
+  <span class="details">was added by
+      <a href="/users/{user}">{user}</a> and appears on
+      <a href="/words/{word}#lists">{count}</a> lists</span>
+</li>
+"""
+        for word, count in words.items()
+    )
+    return f"""<html><body>
+<h1 id="headword">{title} <span class="heart_quotes right loveOnly"></span></h1>
+<ul id="sortable_wordlist">
+{items}<li class="word hidden"><a href="/words/hidden">hidden</a></li>
+</ul>
+{f'<a rel="next" href="{next_href}">Next</a>' if next_href else ""}
+</body></html>"""
+
+
+class MockApi:
+    """A local stand-in for the parts of the Wordnik v4 API we use,
+    serving a dict of permalink: words for user hugovk"""
+
+    def __init__(self, lists, api_key="test-key", login_latency=0.0):
+        self.lists = lists
+        self.api_key = api_key
+        self.login_latency = login_latency
+        self.users = {"hugovk": "secret", "nobody": "wrong"}
+        self.tokens = set()
+        self.logins = 0
+        self._counter = itertools.count(1)
+
+    def pages(self, prefix="/v4"):
+        """Return the paths to serve for a FixtureServer"""
+        paths = [f"{prefix}/account.json/authenticate/{user}" for user in self.users]
+        paths += [f"{prefix}/wordList.json/{name}/words" for name in self.lists]
+        return dict.fromkeys(paths, self)
+
+    def __call__(self, handler):
+        parts = urlsplit(handler.path)
+        query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        if query.get("api_key") != self.api_key:
+            return 401, {}, json.dumps({"message": "Bad API key"})
+
+        path = parts.path.split("/")
+        if path[-2] == "authenticate":
+            time.sleep(self.login_latency)
+            self.logins += 1
+            if query.get("password") != self.users.get(path[-1]):
+                return 403, {}, json.dumps({"message": "Bad password"})
+            token = f"token-{next(self._counter)}"
+            self.tokens.add(token)
+            return 200, {}, json.dumps({"token": token, "userId": 1})
+
+        if handler.headers.get("auth_token") not in self.tokens:
+            return 401, {}, json.dumps({"message": "Not logged in"})
+        words = self.lists[path[-2]]
+        start = int(query["skip"])
+        end = start + int(query["limit"])
+        return 200, {}, json.dumps([{"word": word} for word in words[start:end]])
+
+
+class FixtureServer:
+    """Serve canned pages from localhost.
+
+    "pages" maps a path (without query string) to either bytes, a string,
+    or a callable taking the request handler and returning
+    (status, headers, body).
+    "latency" is the delay in seconds added to every response.
+    """
+
+    def __init__(self, pages, latency=0.0):
+        self.pages = pages
+        self.latency = latency
+        self.requests = []
+        self.connections = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                with fixture._lock:
+                    fixture.connections += 1
+                super().setup()
+
+            def do_GET(self):
+                fixture._handle(self)
+
+            def do_POST(self):
+                fixture._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(
+            target=self._server.serve_forever, args=(0.05,), daemon=True
+        ).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handle(self, handler):
+        with self._lock:
+            self.requests.append(handler.path)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            page = self.pages.get(unquote(urlsplit(handler.path).path))
+            if page is None:
+                status, headers, body = 404, {}, b"Not found"
+            elif callable(page):
+                status, headers, body = page(handler)
+            else:
+                status, headers, body = 200, {}, page
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        handler.send_response(status)
+        headers.setdefault("Content-Type", "text/html; charset=utf-8")
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+
+# End of file
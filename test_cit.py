@@ -3,6 +3,8 @@
 """
 Unit tests for cit.py
 """
+import os
+import tempfile
 import unittest
 import datetime
 
@@ -149,6 +151,45 @@ class TestIt(unittest.TestCase):
             '"<b>THIS PHRASE</b>".',
         )
 
+    def test_embolden_regex_metacharacters(self):
+        # Arrange
+        word = "C++ (lang.)"
+        quote = "Written in c++ (lang.) not C"
+
+        # Act
+        ret = cit.embolden(word, quote)
+
+        # Assert
+        self.assertEqual(ret, "Written in <b>c++ (lang.)</b> not C")
+
+    def test_embolden_many(self):
+        # Arrange
+        words = ["this", "this phrase", "that", ""]
+        quotes = ["This phrase and that", "no match", "this and THIS PHRASE"]
+
+        # Act
+        ret = cit.embolden_many(words, quotes)
+
+        # Assert
+        self.assertEqual(
+            ret,
+            [
+                "<b>This phrase</b> and <b>that</b>",
+                "no match",
+                "<b>this</b> and <b>THIS PHRASE</b>",
+            ],
+        )
+
+    def test_embolden_many_no_words(self):
+        # Arrange
+        quotes = ["unchanged"]
+
+        # Act
+        ret = cit.embolden_many([], quotes)
+
+        # Assert
+        self.assertEqual(ret, ["unchanged"])
+
     def test_source_from_url_washingtonpost(self):
         # Arrange
         url = (
@@ -226,6 +267,65 @@ class TestIt(unittest.TestCase):
         # Assert
         self.assertEqual(ret, "20 January 2016")
 
+    def test_format_citation(self):
+        # Arrange
+        url = "https://example.com/post"
+
+        # Act
+        ret = cit.format_citation(
+            "spinning rust",
+            "n.",
+            "A hard disk.",
+            "Moved to spinning rust.",
+            url,
+            "Example",
+            "16 March 2015",
+        )
+
+        # Assert
+        self.assertEqual(
+            ret,
+            "<b>spinning rust</b>, <i>n.</i> A hard disk.\n\n"
+            '<a href="https://example.com/post"><i>Example</i>, 16 March 2015</a>:'
+            "\n\n<blockquote>Moved to <b>spinning rust</b>.</blockquote>\n\n",
+        )
+
+    def test_read_citations_csv_and_jsonl(self):
+        # Arrange
+        with tempfile.TemporaryDirectory() as tmpdir:
+            csv_file = os.path.join(tmpdir, "cites.csv")
+            jsonl_file = os.path.join(tmpdir, "cites.jsonl")
+            with open(csv_file, "w", encoding="utf-8") as f:
+                f.write('word,pos,quote\ncafé,n.,"A café, open late"\n')
+            with open(jsonl_file, "w", encoding="utf-8") as f:
+                f.write('{"word": "café", "pos": "n.", "quote": "A café, open late"}\n')
+
+            # Act
+            from_csv = cit.read_citations(csv_file)
+            from_jsonl = cit.read_citations(jsonl_file)
+
+        # Assert
+        self.assertEqual(from_csv, from_jsonl)
+        self.assertEqual(from_csv[0]["quote"], "A café, open late")
+
+    def test_format_citations_and_words_by_list(self):
+        # Arrange
+        citations = [
+            {"word": "one", "source": "A", "date": "1 May 2015", "list": "x"},
+            {"word": "two", "pos": "v.", "source": "B", "date": "1 May 2015"},
+            {"word": "one", "source": "C", "date": "1 May 2015", "list": "x"},
+        ]
+
+        # Act
+        texts = cit.format_citations(citations)
+        lists = cit.words_by_list(citations, "default")
+
+        # Assert
+        self.assertEqual(len(texts), 3)
+        self.assertTrue(texts[0].startswith("<b>one</b>, <i>n.</i>"))
+        self.assertTrue(texts[1].startswith("<b>two</b>, <i>v.</i>"))
+        self.assertEqual(lists, {"x": ["one"], "default": ["two"]})
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Startup tests for the command-line tools: --help shouldn't load
+heavy dependencies, and should stay within a time budget.
+
+The budget is relative to the bare interpreter's own import time, measured
+alongside, so it scales with the speed and load of the machine
+"""
+import os
+import subprocess
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS = [
+    "cit.py",
+    "wordnik_comment_scraper.py",
+    "wordnik_list_downloader.py",
+    "wordnik_list_scraper.py",
+]
+HEAVY_MODULES = {"asyncio", "bs4", "dateutil", "lxml", "word_tools", "yaml"}
+# Import time allowed on top of a bare interpreter, as a multiple of the
+# bare interpreter's. The tools take under 1, importing bs4 alone takes 1.7
+STARTUP_BUDGET = 1.5
+# Take the fastest of this many runs, to leave out noise from other processes
+RUNS = 7
+
+
+def import_times(*args):
+    """Run Python with -X importtime and return {module: self seconds}"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=HERE,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            self_us, _, name = line.partition(":")[2].split("|")
+            if self_us.strip().isdigit():
+                times[name.strip()] = int(self_us) / 1_000_000
+    return times
+
+
+def fastest_import_times(commands):
+    """Return the fastest total import time of each command's runs. The
+    commands take turns, so a busy spell slows them all alike"""
+    fastest = [float("inf")] * len(commands)
+    for _ in range(RUNS):
+        for i, args in enumerate(commands):
+            fastest[i] = min(fastest[i], sum(import_times(*args).values()))
+    return fastest
+
+
+class TestIt(unittest.TestCase):
+    def test_help_skips_heavy_imports(self):
+        for script in SCRIPTS:
+            with self.subTest(script=script):
+                # Act
+                times = import_times(script, "--help")
+
+                # Assert
+                loaded = {name.split(".")[0] for name in times}
+                self.assertEqual(loaded & HEAVY_MODULES, set())
+
+    def test_help_within_budget(self):
+        # Act
+        baseline, *times = fastest_import_times(
+            [("-c", "pass")] + [(script, "--help") for script in SCRIPTS]
+        )
+
+        # Assert
+        for script, elapsed in zip(SCRIPTS, times):
+            with self.subTest(script=script):
+                self.assertLess(elapsed - baseline, STARTUP_BUDGET * baseline)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# End of file
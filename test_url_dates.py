@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Unit tests for url_dates.py
+"""
+import datetime
+import unittest
+
+import url_dates
+
+
+class TestIt(unittest.TestCase):
+    def test_twitter_status_id(self):
+        # Arrange
+        url = "https://twitter.com/Chris_Boardman/status/691588823419977728"
+
+        # Act
+        ret = url_dates.date_from_url(url)
+
+        # Assert
+        self.assertEqual(ret.date(), datetime.date(2016, 1, 25))
+
+    def test_yyyymmdd_slug(self):
+        # Arrange
+        url = "https://example.com/news/20190304-story"
+
+        # Act
+        ret = url_dates.date_from_url(url)
+
+        # Assert
+        self.assertEqual(ret, datetime.datetime(2019, 3, 4))
+
+    def test_impossible_date_is_not_used(self):
+        # Arrange
+        url = "https://example.com/2016/02/30/story/20160229"
+
+        # Act
+        ret = url_dates.date_from_url(url)
+
+        # Assert
+        self.assertEqual(ret, datetime.datetime(2016, 2, 29))
+
+    def test_results_are_cached(self):
+        # Arrange
+        url = "https://example.com/2017/05/06/cached"
+        url_dates.date_from_url(url)
+        hits = url_dates.date_from_url.cache_info().hits
+
+        # Act
+        ret = url_dates.date_from_url(url)
+
+        # Assert
+        self.assertEqual(ret, datetime.datetime(2017, 5, 6))
+        self.assertEqual(url_dates.date_from_url.cache_info().hits, hits + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# End of file
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Unit tests for url_sources.py
+"""
+import json
+import os
+import tempfile
+import unittest
+
+import url_sources
+
+
+class TestIt(unittest.TestCase):
+    def test_twitter_handle_made_of_url_characters(self):
+        # Arrange
+        url = "https://twitter.com/hugovk/status/691588823419977728"
+
+        # Act
+        ret = url_sources.source_from_url(url)
+
+        # Assert
+        self.assertEqual(ret, "@hugovk")
+
+    def test_subdomain_of_known_site(self):
+        # Arrange
+        url = "https://cooking.nytimes.com/recipes/1015819"
+
+        # Act
+        ret = url_sources.source_from_url(url)
+
+        # Assert
+        self.assertEqual(ret, "The New York Times")
+
+    def test_unknown_site_with_multipart_suffix(self):
+        # Arrange
+        url = "https://www.theguardian.co.uk/science"
+
+        # Act
+        ret = url_sources.source_from_url(url)
+
+        # Assert
+        self.assertEqual(ret, "The Guardian")
+
+    def test_extra_mapping_file_overrides_default(self):
+        # Arrange
+        with tempfile.TemporaryDirectory() as tmpdir:
+            extra = os.path.join(tmpdir, "extra.json")
+            with open(extra, "w", encoding="utf-8") as f:
+                json.dump({"BBC.co.uk": "BBC News", "bikeradar.com": "Bike Radar"}, f)
+            sources = url_sources.load_sources(url_sources.DEFAULT_SOURCES, extra)
+        resolver = url_sources.SourceResolver(sources)
+
+        # Act
+        bbc = resolver.resolve("https://www.bbc.co.uk/news/1")
+        resolver.resolve("https://www.bbc.co.uk/news/2")
+        bikeradar = resolver.resolve("http://www.bikeradar.com/news/")
+
+        # Assert
+        self.assertEqual(bbc, "BBC News")
+        self.assertEqual(bikeradar, "Bike Radar")
+        self.assertEqual(resolver.for_netloc.cache_info().hits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# End of file
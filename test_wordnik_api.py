@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Unit tests for wordnik_api.py
+"""
+import asyncio
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+from urllib.error import HTTPError
+
+import wordnik_api
+from fixture_server import FixtureServer, MockApi
+
+LISTS = {
+    "fruit": [f"fruit{i}" for i in range(25)],
+    "veg": ["carrot", "leek"],
+}
+CREDENTIALS = {
+    "wordnik_username": "hugovk",
+    "wordnik_password": "secret",
+    "wordnik_api_key": "test-key",
+}
+
+
+class TestIt(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.token_cache = wordnik_api.TokenCache(
+            os.path.join(self.tmp_dir, "token.json")
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def download(self, server, permalinks, credentials=CREDENTIALS):
+        return asyncio.run(
+            wordnik_api.download(
+                credentials,
+                permalinks,
+                server.url + "/v4",
+                page_size=10,
+                token_cache=self.token_cache,
+            )
+        )
+
+    def test_download_pages_through_lists(self):
+        # Arrange
+        api = MockApi(LISTS)
+        with FixtureServer(api.pages()) as server:
+
+            # Act
+            ret = self.download(server, ["fruit", "veg"])
+
+        # Assert
+        self.assertEqual(ret, LISTS)
+        # 1 login, 25 words in pages of 10 + 2 words in 1 page
+        self.assertEqual(len(server.requests), 1 + 3 + 1)
+
+    def test_authenticate_reuses_token(self):
+        # Arrange
+        async def authenticate_twice(base_url):
+            client = wordnik_api.WordnikClient("test-key", base_url)
+            first = await client.authenticate("hugovk", "secret")
+            second = await client.authenticate("hugovk", "secret")
+            return first, second
+
+        api = MockApi(LISTS)
+        with FixtureServer(api.pages()) as server:
+
+            # Act
+            ret = asyncio.run(authenticate_twice(server.url + "/v4"))
+
+        # Assert
+        self.assertEqual(ret, ("token-1", "token-1"))
+        self.assertEqual(api.logins, 1)
+
+    def test_authenticate_bad_password(self):
+        # Arrange
+        credentials = dict(CREDENTIALS, wordnik_username="nobody")
+        api = MockApi(LISTS)
+        with FixtureServer(api.pages()) as server:
+
+            # Act / Assert
+            with self.assertRaises(HTTPError) as cm:
+                self.download(server, [], credentials)
+            self.assertEqual(cm.exception.code, 403)
+
+    def test_token_cache_reused_between_runs(self):
+        # Arrange
+        api = MockApi(LISTS)
+        with FixtureServer(api.pages()) as server:
+
+            # Act
+            self.download(server, ["veg"])
+            ret = self.download(server, ["veg"])
+
+        # Assert
+        self.assertEqual(ret, {"veg": LISTS["veg"]})
+        self.assertEqual(api.logins, 1)
+        mode = os.stat(self.token_cache.filename).st_mode
+        self.assertEqual(stat.S_IMODE(mode), 0o600)
+
+    def test_token_cache_refreshed_once_when_rejected(self):
+        # Arrange
+        api = MockApi(LISTS)
+        with FixtureServer(api.pages()) as server:
+            self.download(server, ["veg"])
+            api.tokens.clear()
+
+            # Act
+            ret = self.download(server, ["fruit", "veg"])
+
+        # Assert
+        self.assertEqual(ret, LISTS)
+        self.assertEqual(api.logins, 2)
+        self.assertEqual(self.token_cache.load("hugovk"), "token-2")
+        self.assertIsNone(self.token_cache.load("someone else"))
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# End of file
@@ -0,0 +1,360 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Unit tests for wordnik_comment_scraper.py
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from bs4 import BeautifulSoup
+
+import wordnik_comment_scraper
+import wordnik_http
+import wordnik_list_scraper
+from fixture_server import FixtureServer, list_page, word_page
+
+
+WORDS = ["apple", "banana", "cherry", "damson", "elderberry"]
+PAGES = {
+    "/words/" + word: word_page(word, ("hugovk", f"<b>{word}</b>"), ("other", "no"))
+    for word in WORDS
+}
+
+
+class TestIt(unittest.TestCase):
+    def setUp(self):
+        wordnik_http.rate_limiter.interval = 0
+
+    def test_scrape_word_comments_user(self):
+        # Arrange
+        with FixtureServer(PAGES) as server:
+
+            # Act
+            ret = wordnik_comment_scraper.scrape_word_comments(
+                "apple", "hugovk", base_url=server.url
+            )
+
+        # Assert
+        self.assertEqual(len(ret), 1)
+        self.assertIn("<b>apple</b>", str(ret[0]))
+        self.assertNotIn("report_comment", str(ret[0]))
+        self.assertNotIn("spam", str(ret[0]))
+        self.assertIn('href="https://www.wordnik.com/words/apple"', str(ret[0]))
+
+    def test_scrape_word_comments_all_users(self):
+        # Arrange
+        with FixtureServer(PAGES) as server:
+
+            # Act
+            ret = wordnik_comment_scraper.scrape_word_comments(
+                "apple", base_url=server.url
+            )
+
+        # Assert
+        self.assertEqual(len(ret), 2)
+
+    def test_scrape_words_comments_concurrent_keeps_order(self):
+        # Arrange
+        words = list(reversed(WORDS))
+        with FixtureServer(PAGES, latency=0.2) as server:
+
+            # Act
+            start = time.monotonic()
+            ret = list(
+                wordnik_comment_scraper.scrape_words_comments(
+                    words, "hugovk", concurrency=5, base_url=server.url
+                )
+            )
+            elapsed = time.monotonic() - start
+
+        # Assert
+        self.assertEqual([word for word, comments in ret], words)
+        for word, comments in ret:
+            self.assertIn(f"<b>{word}</b>", str(comments[0]))
+        self.assertGreater(server.max_in_flight, 1)
+        self.assertLess(elapsed, 0.2 * len(words))
+
+    def test_scrape_words_comments_serial(self):
+        # Arrange
+        with FixtureServer(PAGES) as server:
+
+            # Act
+            ret = list(
+                wordnik_comment_scraper.scrape_words_comments(
+                    WORDS, "hugovk", concurrency=1, base_url=server.url
+                )
+            )
+
+        # Assert
+        self.assertEqual([word for word, comments in ret], WORDS)
+        self.assertEqual(server.max_in_flight, 1)
+
+    def test_journal_resume_skips_finished_words(self):
+        # Arrange
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        filename = os.path.join(tmp_dir, "page.journal")
+        with FixtureServer(PAGES) as server:
+            journal = wordnik_comment_scraper.Journal(filename, sync_every=2)
+            first_run = wordnik_comment_scraper.scrape_words_comments(
+                WORDS, "hugovk", base_url=server.url, journal=journal
+            )
+            expected = [next(first_run), next(first_run)]
+            # Crash mid-write
+            journal.close()
+            with open(filename, "a") as f:
+                f.write('{"word": "cherry", "comm')
+
+            # Act
+            journal = wordnik_comment_scraper.Journal(filename, resume=True)
+            ret = list(
+                wordnik_comment_scraper.scrape_words_comments(
+                    WORDS, "hugovk", base_url=server.url, journal=journal
+                )
+            )
+            journal.close()
+            resumed = journal.load()
+
+        # Assert
+        self.assertEqual(list(resumed), WORDS)
+        self.assertEqual(
+            [(word, [str(c) for c in comments]) for word, comments in ret[:2]],
+            [(word, [str(c) for c in comments]) for word, comments in expected],
+        )
+        self.assertEqual([word for word, comments in ret], WORDS)
+        self.assertEqual(server.requests, ["/words/" + word for word in WORDS])
+
+    def test_extract_comment(self):
+        # Arrange
+        page = word_page("apple", ("HugoVK", '<a href="/words/pear">pear</a>'))
+        soup = BeautifulSoup(page, "lxml")
+        comment = soup.find("li", class_="comment")
+
+        # Act
+        other = wordnik_comment_scraper.extract_comment(comment, "someone")
+        ret = wordnik_comment_scraper.extract_comment(comment, "hugovk")
+
+        # Assert
+        self.assertIsNone(other)
+        self.assertEqual(ret.name, "div")
+        self.assertIn('<a href="https://www.wordnik.com/words/pear">', str(ret))
+        self.assertIn('<a href="https://www.wordnik.com/users/HugoVK">', str(ret))
+        self.assertIsNone(ret.find("a", class_="report_comment"))
+        self.assertNotIn("<!--", str(ret))
+
+    def test_comment_record(self):
+        # Arrange
+        with FixtureServer(PAGES) as server:
+            comments = wordnik_comment_scraper.scrape_word_comments(
+                "apple", "hugovk", base_url=server.url
+            )
+
+        # Act
+        ret = wordnik_comment_scraper.comment_record("apple", comments[0])
+
+        # Assert
+        self.assertEqual(ret["word"], "apple")
+        self.assertEqual(ret["author"], "hugovk")
+        self.assertEqual(ret["timestamp"], "2018-08-03")
+        self.assertEqual(ret["text"], "apple")
+        self.assertEqual(ret["html"], str(comments[0]))
+
+    def test_scrape_list_comments(self):
+        # Arrange
+        pages = dict(PAGES)
+        pages["/lists/fruit"] = list_page("Fruit", ["cherry", "apple", "banana"])
+        with FixtureServer(pages, latency=0.05) as server:
+            wordlist = wordnik_list_scraper.iter_list("fruit", base_url=server.url)
+
+            # Act
+            words, sections = wordnik_comment_scraper.scrape_list_comments(
+                wordlist, "hugovk", concurrency=3, base_url=server.url
+            )
+            sections = list(sections)
+
+        # Assert
+        self.assertEqual(words, ["apple", "banana", "cherry"])
+        self.assertEqual([word for word, comments in sections], words)
+        self.assertIn("<b>cherry</b>", str(sections[2][1][0]))
+
+    def test_scrape_list_comments_cancelled_when_closed(self):
+        # Arrange
+        words = [f"word{i:02}" for i in range(20)]
+        pages = {"/lists/many": list_page("Many", words)}
+        pages.update({"/words/" + word: word_page(word) for word in words})
+        with FixtureServer(pages, latency=0.1) as server:
+            wordlist = wordnik_list_scraper.scrape_list_entries("many", server.url)[1]
+            words, sections = wordnik_comment_scraper.scrape_list_comments(
+                wordlist, concurrency=2, base_url=server.url
+            )
+
+            # Act
+            first = next(sections)
+            sections.close()
+            time.sleep(0.3)  # Let the fetches already started finish
+
+        # Assert
+        self.assertEqual(first[0], "word00")
+        fetched = [path for path in server.requests if path.startswith("/words/")]
+        self.assertLess(len(fetched), 6)
+
+    def test_journal_kept_unless_resume_or_restart(self):
+        # Arrange
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        filename = os.path.join(tmp_dir, "page.journal")
+        journal = wordnik_comment_scraper.Journal(filename)
+        journal.record("apple", ["<b>apple</b>"])
+        journal.close()
+
+        # Act / Assert
+        with self.assertRaises(FileExistsError):
+            wordnik_comment_scraper.Journal(filename)
+        journal = wordnik_comment_scraper.Journal(filename, resume=True)
+        journal.close()
+        self.assertEqual(list(journal.load()), ["apple"])
+        journal = wordnik_comment_scraper.Journal(filename, restart=True)
+        journal.close()
+        self.assertEqual(journal.load(), {})
+
+    def test_update_page_only_scrapes_changed_words(self):
+        # Arrange
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        filename = os.path.join(tmp_dir, "page.html")
+        pages = dict(PAGES)
+        pages["/lists/fruit"] = list_page("Fruit", WORDS[:3])
+        with FixtureServer(pages) as server:
+
+            # Act
+            first = wordnik_comment_scraper.update_page(
+                filename, "fruit", "hugovk", "Sub", base_url=server.url
+            )
+            with open(filename, encoding="utf-8") as f:
+                first_html = f.read()
+            second = wordnik_comment_scraper.update_page(
+                filename, "fruit", "hugovk", "Sub", base_url=server.url
+            )
+            pages["/lists/fruit"] = list_page(
+                "Fruit", {"apple": 2, "banana": 3, "cherry": 2, "damson": 1}
+            )
+            third = wordnik_comment_scraper.update_page(
+                filename, "fruit", "hugovk", "Sub", base_url=server.url
+            )
+            with open(filename, encoding="utf-8") as f:
+                third_html = f.read()
+
+        # Assert
+        self.assertEqual(first, 3)
+        self.assertEqual(second, 0)
+        self.assertEqual(third, 2)
+        self.assertIn("<title>Fruit</title>", first_html)
+        self.assertEqual(
+            list(wordnik_comment_scraper.split_sections(third_html)),
+            ["apple", "banana", "cherry", "damson"],
+        )
+        self.assertIn("<b>damson</b>", third_html)
+        self.assertEqual(
+            [path for path in server.requests if path.startswith("/words/")],
+            ["/words/apple", "/words/banana", "/words/cherry"]
+            + ["/words/banana", "/words/damson"],
+        )
+
+    def test_update_page_refreshes_old_words(self):
+        # Arrange
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        filename = os.path.join(tmp_dir, "page.html")
+        pages = dict(PAGES)
+        pages["/lists/fruit"] = list_page("Fruit", WORDS[:2])
+        with FixtureServer(pages) as server:
+            wordnik_comment_scraper.update_page(
+                filename, "fruit", "hugovk", "Sub", base_url=server.url
+            )
+            with open(filename + ".manifest.json", encoding="utf-8") as f:
+                manifest = json.load(f)
+            manifest["words"]["apple"]["scraped"] -= 8 * 24 * 60 * 60
+            with open(filename + ".manifest.json", "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+
+            # Act
+            second = wordnik_comment_scraper.update_page(
+                filename, "fruit", "hugovk", "Sub", base_url=server.url
+            )
+            third = wordnik_comment_scraper.update_page(
+                filename, "fruit", "hugovk", "Sub", base_url=server.url
+            )
+            forced = wordnik_comment_scraper.update_page(
+                filename, "fruit", "hugovk", "Sub", base_url=server.url, refresh_after=0
+            )
+
+        # Assert
+        self.assertEqual(second, 1)
+        self.assertEqual(third, 0)
+        self.assertEqual(forced, 2)
+        self.assertEqual(
+            [path for path in server.requests if path.startswith("/words/")],
+            ["/words/apple", "/words/banana", "/words/apple"]
+            + ["/words/apple", "/words/banana"],
+        )
+
+    def test_refresh_due_spread_over_period(self):
+        # Arrange
+        day = 24 * 60 * 60
+        words = [f"word{i}" for i in range(700)]
+        scraped = 1_600_000_000
+
+        # Act
+        due = [
+            [
+                word
+                for word in words
+                if wordnik_comment_scraper.refresh_due(
+                    word, scraped, scraped + n * day, 7 * day
+                )
+            ]
+            for n in range(1, 8)
+        ]
+
+        # Assert
+        newly_due = [len(set(due[0]))] + [
+            len(set(today) - set(yesterday)) for yesterday, today in zip(due, due[1:])
+        ]
+        self.assertEqual(sum(newly_due), 700)
+        self.assertEqual(len(due[-1]), 700)
+        for count in newly_due:
+            self.assertLess(count, 150)
+        self.assertTrue(
+            wordnik_comment_scraper.refresh_due("word", scraped, scraped, 0)
+        )
+
+    def test_split_sections(self):
+        # Arrange
+        html = (
+            '<ol class="index">\n</ol>\n'
+            '<div id="one">\n<div class="body">1</div>\n</div>\n'
+            '<div id="two words">\n</div>\n'
+            "\n  </body>\n</html>\n"
+        )
+
+        # Act
+        ret = wordnik_comment_scraper.split_sections(html)
+
+        # Assert
+        self.assertEqual(
+            ret,
+            {
+                "one": '<div id="one">\n<div class="body">1</div>\n</div>\n',
+                "two words": '<div id="two words">\n</div>\n',
+            },
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# End of file
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Unit tests for wordnik_daemon.py
+"""
+import argparse
+import contextlib
+import http.client
+import io
+import unittest
+
+import cit
+import wordnik_comment_scraper
+import wordnik_daemon
+import wordnik_http
+import wordnik_list_scraper
+import wordnik_profile
+from fixture_server import FixtureServer, list_page, word_page
+
+PAGES = {
+    "/lists/fruit": list_page("Fruit", ["apple", "banana"]),
+    "/words/apple": word_page("apple", ("hugovk", "<b>apple</b>"), ("other", "no")),
+}
+
+
+class TestIt(unittest.TestCase):
+    def setUp(self):
+        wordnik_http.rate_limiter.interval = 0
+
+    def tearDown(self):
+        wordnik_daemon.client = None
+
+    def connect(self, daemon):
+        parser = argparse.ArgumentParser()
+        wordnik_daemon.add_arguments(parser)
+        return wordnik_daemon.connect(parser.parse_args(["--daemon", daemon.url]))
+
+    def test_connect_without_daemon(self):
+        # Arrange
+        with wordnik_daemon.Daemon() as daemon:
+            address = daemon.url
+        parser = argparse.ArgumentParser()
+        wordnik_daemon.add_arguments(parser)
+        args = parser.parse_args(["--daemon", address])
+
+        # Act
+        ret = wordnik_daemon.connect(args)
+
+        # Assert
+        self.assertIsNone(ret)
+        self.assertIsNone(wordnik_daemon.client)
+
+    def connect_with_options(self, daemon, options):
+        parser = argparse.ArgumentParser()
+        wordnik_daemon.add_arguments(parser)
+        wordnik_http.add_arguments(parser)
+        wordnik_profile.add_arguments(parser)
+        args = parser.parse_args(["--daemon", daemon.url] + options)
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            ret = wordnik_daemon.connect(args)
+        return ret, stderr.getvalue()
+
+    def test_connect_with_same_fetch_options(self):
+        # Arrange
+        with wordnik_daemon.Daemon() as daemon:
+            # Act
+            ret, warning = self.connect_with_options(daemon, [])
+
+        # Assert
+        self.assertIsNotNone(ret)
+        self.assertIs(wordnik_daemon.client, ret)
+        self.assertEqual(warning, "")
+
+    def test_connect_with_different_fetch_options(self):
+        # Arrange
+        with wordnik_daemon.Daemon() as daemon:
+            # Act
+            ret, warning = self.connect_with_options(
+                daemon, ["--offline", "--max-age", "60"]
+            )
+
+        # Assert
+        self.assertIsNone(ret)
+        self.assertIsNone(wordnik_daemon.client)
+        self.assertIn("--max-age, --offline differ", warning)
+
+    def test_connect_while_profiling(self):
+        # Arrange
+        with wordnik_daemon.Daemon() as daemon:
+            # Act
+            ret, warning = self.connect_with_options(
+                daemon, ["--trace-out", "trace.json"]
+            )
+
+        # Assert
+        self.assertIsNone(ret)
+        self.assertIn("profiling", warning)
+
+    def test_list_through_daemon_is_remembered(self):
+        # Arrange
+        with FixtureServer(PAGES) as server, wordnik_daemon.Daemon(
+            base_url=server.url
+        ) as daemon:
+            self.connect(daemon)
+
+            # Act
+            first = wordnik_list_scraper.scrape_list_entries("fruit", server.url)
+            second = wordnik_list_scraper.scrape_list_entries("fruit", server.url)
+
+        # Assert
+        self.assertEqual(first[0], "Fruit")
+        self.assertEqual([word for word, metadata in first[1]], ["apple", "banana"])
+        self.assertEqual(first, second)
+        self.assertEqual(len(server.requests), 1)
+        self.assertEqual(daemon.memory.hits, 1)
+
+    def test_word_comments_through_daemon(self):
+        # Arrange
+        with FixtureServer(PAGES) as server, wordnik_daemon.Daemon(
+            base_url=server.url
+        ) as daemon:
+            self.connect(daemon)
+
+            # Act
+            ret = wordnik_comment_scraper.scrape_and_record(
+                "apple", "hugovk", server.url
+            )
+
+        # Assert
+        self.assertEqual(len(ret), 1)
+        self.assertIn("<b>apple</b>", ret[0])
+        record = wordnik_comment_scraper.comment_record("apple", ret[0])
+        self.assertEqual(record["author"], "hugovk")
+
+    def test_word_comments_error_passed_on(self):
+        # Arrange
+        saved = wordnik_http.retry_policy
+        self.addCleanup(setattr, wordnik_http, "retry_policy", saved)
+        wordnik_http.retry_policy = wordnik_http.RetryPolicy(retries=0)
+        with FixtureServer(PAGES) as server, wordnik_daemon.Daemon(
+            base_url=server.url
+        ) as daemon:
+            self.connect(daemon)
+
+            # Act / Assert
+            with self.assertRaises(wordnik_http.HTTPError) as cm:
+                wordnik_comment_scraper.scrape_and_record("missing", None, server.url)
+        self.assertEqual(cm.exception.code, 404)
+
+    def test_other_base_url_refused(self):
+        # Arrange
+        with FixtureServer(PAGES) as server, wordnik_daemon.Daemon() as daemon:
+            client = wordnik_daemon.DaemonClient(daemon.url)
+
+            # Act / Assert
+            with self.assertRaises(wordnik_http.HTTPError) as cm:
+                client.list_entries("fruit", server.url, "bs4")
+        self.assertEqual(cm.exception.code, 403)
+        self.assertEqual(server.requests, [])
+
+    def test_other_host_refused(self):
+        # Arrange
+        with wordnik_daemon.Daemon() as daemon:
+            host, port = wordnik_daemon.split_address(daemon.url)
+            connection = http.client.HTTPConnection(host, port)
+
+            # Act
+            connection.request("GET", "/ping", headers={"Host": "evil.example:8765"})
+            response = connection.getresponse()
+            response.read()
+            connection.close()
+
+        # Assert
+        self.assertEqual(response.status, 403)
+
+    def test_cite_through_daemon(self):
+        # Arrange
+        citations = [{"word": "one", "source": "A", "date": "1 May 2015"}]
+        expected = cit.format_citations(citations)
+        with wordnik_daemon.Daemon() as daemon:
+            self.connect(daemon)
+
+            # Act
+            ret = cit.cite_all(citations)
+
+        # Assert
+        self.assertEqual(ret, expected)
+        self.assertEqual(daemon.requests, 2)  # Ping and cite
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# End of file
@@ -0,0 +1,352 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Unit tests for wordnik_http.py
+"""
+import io
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from urllib.error import HTTPError
+
+import wordnik_http
+from fixture_server import FixtureServer
+
+
+def etag_page(handler):
+    """Return 304 if the client already has the current version"""
+    if handler.headers.get("If-None-Match") == '"v1"':
+        return 304, {"ETag": '"v1"'}, b""
+    return 200, {"ETag": '"v1"'}, b"versioned"
+
+
+def flaky(*responses):
+    """Return a page which gives each (status, headers, body) in turn,
+    then 200 OK. A status of None means delay 0.3 seconds"""
+    responses = list(responses)
+
+    def page(handler):
+        if responses:
+            status, headers, body = responses.pop(0)
+            if status is None:
+                time.sleep(0.3)
+                return 200, headers, body
+            return status, headers, body
+        return 200, {}, b"finally"
+
+    return page
+
+
+PAGES = {
+    "/plain": b"plain",
+    "/etag": etag_page,
+    "/moved": lambda handler: (301, {"Location": "/plain"}, b""),
+    "/error": lambda handler: (500, {}, b"Server error"),
+}
+
+
+class TestIt(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.saved = {
+            name: getattr(wordnik_http, name)
+            for name in ["retry_policy", "breaker", "stats"]
+        }
+        wordnik_http.rate_limiter.interval = 0
+        wordnik_http.cache = wordnik_http.Cache(self.cache_dir)
+        wordnik_http.offline = False
+        wordnik_http.retry_policy = wordnik_http.RetryPolicy(retries=3, backoff=0.01)
+        wordnik_http.breaker = wordnik_http.CircuitBreaker(cooldown=0.01)
+        wordnik_http.stats = wordnik_http.Stats()
+
+    def tearDown(self):
+        wordnik_http.cache = None
+        wordnik_http.offline = False
+        for name, value in self.saved.items():
+            setattr(wordnik_http, name, value)
+        shutil.rmtree(self.cache_dir)
+
+    def test_rate_limiter_spaces_requests_per_host(self):
+        # Arrange
+        limiter = wordnik_http.RateLimiter(0.05)
+
+        # Act
+        start = time.monotonic()
+        for _ in range(4):
+            limiter.wait("example.com")
+        limiter.wait("example.org")
+        elapsed = time.monotonic() - start
+
+        # Assert
+        self.assertGreaterEqual(elapsed, 0.15)
+        self.assertLess(elapsed, 0.3)
+
+    def test_fetch_fresh_cache_hit(self):
+        # Arrange
+        with FixtureServer(PAGES) as server:
+            url = server.url + "/plain"
+
+            # Act
+            first = wordnik_http.fetch(url)
+            second = wordnik_http.fetch(url)
+
+        # Assert
+        self.assertEqual(first, b"plain")
+        self.assertEqual(second, b"plain")
+        self.assertEqual(server.requests, ["/plain"])
+
+    def test_fetch_stale_revalidates_with_etag(self):
+        # Arrange
+        wordnik_http.cache.max_age = 0
+        with FixtureServer(PAGES) as server:
+            url = server.url + "/etag"
+
+            # Act
+            first = wordnik_http.fetch(url)
+            second = wordnik_http.fetch(url)
+
+        # Assert
+        self.assertEqual(first, b"versioned")
+        self.assertEqual(second, b"versioned")
+        self.assertEqual(len(server.requests), 2)
+
+    def test_fetch_max_age_zero_always_revalidates(self):
+        # Arrange
+        with FixtureServer(PAGES) as server:
+            url = server.url + "/etag"
+
+            # Act
+            first = wordnik_http.fetch(url, max_age=0)
+            second = wordnik_http.fetch(url, max_age=0)
+            third = wordnik_http.fetch(url)
+
+        # Assert
+        self.assertEqual([first, second, third], [b"versioned"] * 3)
+        self.assertEqual(len(server.requests), 2)
+
+    def test_fetch_offline_uses_stale_cache(self):
+        # Arrange
+        wordnik_http.cache.max_age = 0
+        with FixtureServer(PAGES) as server:
+            url = server.url + "/plain"
+            wordnik_http.fetch(url)
+            wordnik_http.offline = True
+
+            # Act
+            ret = wordnik_http.fetch(url)
+
+        # Assert
+        self.assertEqual(ret, b"plain")
+        self.assertEqual(len(server.requests), 1)
+
+    def test_fetch_offline_not_cached(self):
+        # Arrange
+        wordnik_http.offline = True
+
+        # Act / Assert
+        self.assertRaises(
+            wordnik_http.OfflineError,
+            lambda: wordnik_http.fetch("http://127.0.0.1:1/missing"),
+        )
+
+    def test_fetch_reuses_connection(self):
+        # Arrange
+        wordnik_http.cache = None
+        with FixtureServer(PAGES) as server:
+
+            # Act
+            for _ in range(3):
+                wordnik_http.fetch(server.url + "/plain")
+
+        # Assert
+        self.assertEqual(len(server.requests), 3)
+        self.assertEqual(server.connections, 1)
+
+    def test_fetch_follows_redirect(self):
+        # Arrange
+        with FixtureServer(PAGES) as server:
+
+            # Act
+            ret = wordnik_http.fetch(server.url + "/moved")
+
+        # Assert
+        self.assertEqual(ret, b"plain")
+        self.assertEqual(server.requests, ["/moved", "/plain"])
+
+    def test_fetch_error(self):
+        # Arrange
+        with FixtureServer(PAGES) as server:
+
+            # Act / Assert
+            with self.assertRaises(HTTPError) as cm:
+                wordnik_http.fetch(server.url + "/error")
+            self.assertEqual(cm.exception.code, 500)
+
+    def test_fetch_retries_server_errors(self):
+        # Arrange
+        pages = {"/flaky": flaky((503, {}, b""), (502, {}, b""))}
+        with FixtureServer(pages) as server:
+
+            # Act
+            ret = wordnik_http.fetch(server.url + "/flaky")
+
+        # Assert
+        self.assertEqual(ret, b"finally")
+        self.assertEqual(len(server.requests), 3)
+        self.assertEqual(wordnik_http.stats.retries, 2)
+        self.assertEqual(wordnik_http.stats.failures, 0)
+        self.assertEqual(wordnik_http.stats.statuses, {503: 1, 502: 1, 200: 1})
+
+    def test_fetch_gives_up_after_retries(self):
+        # Arrange
+        with FixtureServer(PAGES) as server:
+
+            # Act
+            with self.assertRaises(HTTPError) as cm:
+                wordnik_http.fetch(server.url + "/error")
+
+        # Assert
+        self.assertEqual(cm.exception.code, 500)
+        self.assertEqual(len(server.requests), 4)
+        self.assertEqual(wordnik_http.stats.retries, 3)
+        self.assertEqual(wordnik_http.stats.failures, 1)
+
+    def test_fetch_retries_timeout(self):
+        # Arrange
+        wordnik_http.pool.read_timeout = 0.1
+        self.addCleanup(setattr, wordnik_http.pool, "read_timeout", 30)
+        pages = {"/slow": flaky((None, {}, b"too late"))}
+        with FixtureServer(pages) as server:
+
+            # Act
+            ret = wordnik_http.fetch(server.url + "/slow")
+
+        # Assert
+        self.assertEqual(ret, b"finally")
+        self.assertEqual(wordnik_http.stats.statuses, {None: 1, 200: 1})
+
+    def test_fetch_honours_retry_after(self):
+        # Arrange
+        pages = {"/throttled": flaky((429, {"Retry-After": "0.3"}, b""))}
+        with FixtureServer(pages) as server:
+
+            # Act
+            start = time.monotonic()
+            ret = wordnik_http.fetch(server.url + "/throttled")
+            elapsed = time.monotonic() - start
+
+        # Assert
+        self.assertEqual(ret, b"finally")
+        self.assertGreaterEqual(elapsed, 0.3)
+        self.assertEqual(wordnik_http.breaker.trips, 1)
+
+    def test_circuit_breaker_pauses_other_threads(self):
+        # Arrange
+        breaker = wordnik_http.CircuitBreaker(threshold=3, cooldown=0.2)
+        waited = []
+
+        def worker():
+            start = time.monotonic()
+            breaker.wait()
+            waited.append(time.monotonic() - start)
+
+        # Act
+        breaker.failure(500)
+        breaker.failure(500)
+        threading.Thread(target=worker).start()
+        breaker.failure(500)
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+
+        # Assert
+        self.assertEqual(breaker.trips, 1)
+        self.assertGreaterEqual(max(waited), 0.15)
+
+    def test_rate_limiter_shared_between_processes(self):
+        # Arrange
+        next_slot = multiprocessing.Value("d", 0.0)
+        limiters = [wordnik_http.RateLimiter(0.05) for _ in range(2)]
+        for limiter in limiters:
+            limiter.shared = next_slot
+
+        # Act
+        start = time.monotonic()
+        for limiter in limiters * 2:
+            limiter.wait("example.com")
+        limiters[0].wait("example.org")
+        elapsed = time.monotonic() - start
+
+        # Assert
+        self.assertGreaterEqual(elapsed, 0.2)
+
+    def test_circuit_breaker_shared_between_processes(self):
+        # Arrange
+        closed_at = multiprocessing.Value("d", 0.0)
+        breaker = wordnik_http.CircuitBreaker(cooldown=0.2)
+        other = wordnik_http.CircuitBreaker(cooldown=0.2)
+        breaker.shared = other.shared = closed_at
+
+        # Act
+        breaker.failure(429)
+        start = time.monotonic()
+        other.wait()
+        elapsed = time.monotonic() - start
+
+        # Assert
+        self.assertEqual(other.trips, 0)
+        self.assertGreaterEqual(elapsed, 0.15)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(wordnik_http.parse_retry_after("120"), 120)
+        self.assertEqual(
+            wordnik_http.parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0
+        )
+        self.assertIsNone(wordnik_http.parse_retry_after("soon"))
+        self.assertIsNone(wordnik_http.parse_retry_after(None))
+
+    def test_stats_report(self):
+        # Arrange
+        stats = wordnik_http.Stats()
+        stats.record(0.07, 200)
+        stats.record(20, None)
+        stats.add(retries=1, failures=1)
+        f = io.StringIO()
+
+        # Act
+        stats.report(f)
+
+        # Assert
+        report = f.getvalue()
+        self.assertIn("2 requests, 1 retries, 1 failures", report)
+        self.assertIn("200: 1, error: 1", report)
+        self.assertIn("<= 0.1s      1", report)
+        self.assertIn("slower      1", report)
+
+    def test_cache_evicts_least_recently_used(self):
+        # Arrange
+        cache = wordnik_http.Cache(self.cache_dir, max_size=2500)
+        cache.put("http://a", b"a" * 1000)
+        cache.put("http://b", b"b" * 1000)
+        old = time.time() - 60
+        os.utime(cache._path("http://a"), (old, old))
+        os.utime(cache._path("http://b"), (old - 10, old - 10))
+        cache.get("http://b")
+
+        # Act
+        cache.put("http://c", b"c" * 1000)
+
+        # Assert
+        self.assertIsNone(cache.get("http://a"))
+        self.assertEqual(cache.get("http://b")["body"], b"b" * 1000)
+        self.assertEqual(cache.get("http://c")["body"], b"c" * 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# End of file
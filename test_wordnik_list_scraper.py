@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Unit tests for wordnik_list_scraper.py
+"""
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import wordnik_http
+import wordnik_list_scraper
+from fixture_server import FixtureServer, list_page
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+PAGED = {
+    "/lists/fruit": list_page("Fruit", ["apple", "banana"], next_href="?page=2"),
+    "/lists/fruit?page=2": list_page("Fruit", ["cherry"], next_href="/lists/fruit"),
+}
+
+
+def paged(handler):
+    """Serve PAGED, including the query string"""
+    return 200, {}, PAGED[handler.path]
+
+
+class TestIt(unittest.TestCase):
+    def setUp(self):
+        wordnik_http.rate_limiter.interval = 0
+
+    def test_scrape_list(self):
+        # Arrange
+        pages = {"/lists/fruit": list_page("Fruit", ["banana", "Apple"])}
+        with FixtureServer(pages) as server:
+
+            # Act
+            title, words = wordnik_list_scraper.scrape_list(
+                "fruit", base_url=server.url
+            )
+
+        # Assert
+        self.assertEqual(title, "Fruit")
+        self.assertEqual(words, ["banana", "Apple"])
+
+    def test_scrape_list_entries_metadata(self):
+        # Arrange
+        pages = {"/lists/fruit": list_page("Fruit", {"apple": 7}, user="someone")}
+        with FixtureServer(pages) as server:
+
+            # Act
+            title, entries = wordnik_list_scraper.scrape_list_entries(
+                "fruit", base_url=server.url
+            )
+
+        # Assert
+        self.assertEqual(
+            entries,
+            [("apple", {"lists": 7, "comments": None, "added_by": "someone"})],
+        )
+
+    def test_parse_list_page_parsers_agree(self):
+        # Arrange
+        words = {f"word {i} é": i for i in range(500)}
+        words.update(
+            {
+                "ne&#39;er-do-well": 1,
+                "R&amp;D": 2,
+                "rock &amp; roll": 3,
+                "caf&eacute;": 4,
+            }
+        )
+        page = list_page("Big & long", words).encode("utf-8")
+
+        # Act
+        streamed = wordnik_list_scraper.parse_list_page(page, "lxml")
+        tree = wordnik_list_scraper.parse_list_page(page, "bs4")
+
+        # Assert
+        self.assertEqual(streamed, tree)
+        self.assertEqual(streamed[0], "Big & long")
+        self.assertEqual(len(streamed[1]), 504)
+        self.assertEqual(streamed[1][499][0], "word 499 é")
+        self.assertEqual(streamed[1][499][1]["lists"], 499)
+        self.assertEqual(
+            [word for word, metadata in streamed[1][500:]],
+            ["ne'er-do-well", "R&D", "rock & roll", "café"],
+        )
+
+    def test_iter_list_follows_pagination(self):
+        for parser in wordnik_list_scraper.PARSERS:
+            with self.subTest(parser=parser):
+                # Arrange
+                with FixtureServer({"/lists/fruit": paged}) as server:
+                    words = wordnik_list_scraper.iter_list(
+                        "fruit", base_url=server.url, parser=parser
+                    )
+                    it = iter(words)
+
+                    # Act
+                    first = next(it)
+                    requests_after_first = len(server.requests)
+                    rest = list(it)
+
+                # Assert
+                self.assertEqual(first[0], "apple")
+                self.assertEqual(requests_after_first, 1)
+                self.assertEqual([entry[0] for entry in rest], ["banana", "cherry"])
+                self.assertEqual(words.title, "Fruit")
+                self.assertEqual(
+                    server.requests, ["/lists/fruit", "/lists/fruit?page=2"]
+                )
+
+    def test_cached_list_page_revalidated(self):
+        # Arrange
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        self.addCleanup(setattr, wordnik_http, "cache", None)
+        wordnik_http.cache = wordnik_http.Cache(cache_dir)
+        pages = {"/lists/fruit": list_page("Fruit", ["apple"])}
+        with FixtureServer(pages) as server:
+            first = wordnik_list_scraper.scrape_list("fruit", server.url)
+            pages["/lists/fruit"] = list_page("Fruit", ["apple", "banana"])
+
+            # Act
+            second = wordnik_list_scraper.scrape_list("fruit", server.url)
+
+        # Assert
+        self.assertEqual(first[1], ["apple"])
+        self.assertEqual(second[1], ["apple", "banana"])
+
+    def test_stream_list(self):
+        # Arrange
+        f = io.StringIO()
+        with FixtureServer({"/lists/fruit": paged}) as server:
+            words = wordnik_list_scraper.iter_list("fruit", base_url=server.url)
+
+            # Act
+            wordnik_list_scraper.stream_list(words, f)
+
+        # Assert
+        self.assertEqual(f.getvalue(), "# Fruit\n\napple\nbanana\ncherry\n")
+
+    def test_stream_list_without_title(self):
+        page = list_page("Fruit", ["apple"]).replace(' id="headword"', "")
+        for parser in wordnik_list_scraper.PARSERS:
+            with self.subTest(parser=parser):
+                # Arrange
+                f = io.StringIO()
+                with FixtureServer({"/lists/fruit": page}) as server:
+                    words = wordnik_list_scraper.iter_list(
+                        "fruit", base_url=server.url, parser=parser
+                    )
+
+                    # Act
+                    wordnik_list_scraper.stream_list(words, f)
+
+                # Assert
+                self.assertEqual(f.getvalue(), "# \n\napple\n")
+
+    def test_main_without_title(self):
+        # Arrange
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        cache_dir = os.path.join(tmp_dir, "cache")
+        page = list_page("Fruit", ["apple"]).replace(' id="headword"', "")
+        wordnik_http.Cache(cache_dir).put(
+            wordnik_list_scraper.WORDNIK_URL + "/lists/fruit", page.encode("utf-8")
+        )
+        script = os.path.join(HERE, "wordnik_list_scraper.py")
+
+        # Act
+        subprocess.run(
+            [sys.executable, script, "fruit", "--no-daemon", "--offline"]
+            + ["--cache-dir", cache_dir, "--jsonl", "fruit.jsonl"],
+            cwd=tmp_dir,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        )
+
+        # Assert
+        with open(os.path.join(tmp_dir, "fruit.txt"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), "# \n\napple")
+
+    def test_scrape_lists(self):
+        # Arrange
+        pages = {
+            f"/lists/list{i}": list_page(f"List {i}", [f"word{i}"]) for i in range(6)
+        }
+        permalinks = [f"list{i}" for i in reversed(range(6))]
+        with FixtureServer(pages, latency=0.05) as server:
+
+            # Act
+            ret = list(
+                wordnik_list_scraper.scrape_lists(
+                    permalinks, concurrency=3, base_url=server.url
+                )
+            )
+
+        # Assert
+        self.assertEqual([r[0] for r in ret], permalinks)
+        self.assertEqual(ret[0][1], "List 5")
+        self.assertEqual([entry[0] for entry in ret[0][2]], ["word5"])
+        self.assertGreater(server.max_in_flight, 1)
+        self.assertLessEqual(server.connections, 3)
+
+    def test_sort_words(self):
+        # Arrange
+        words = ["banana", "Apple", "cherry"]
+
+        # Act
+        ret = wordnik_list_scraper.sort_words(words)
+
+        # Assert
+        self.assertEqual(ret, ["Apple", "banana", "cherry"])
+
+    def test_set_operations_ignore_case(self):
+        # Arrange
+        first = ["Apple", "banana", "cherry", "apple"]
+        second = ["apple", "Damson"]
+        third = ["BANANA"]
+
+        # Act
+        diff = wordnik_list_scraper.set_operation("diff", [first, second, third])
+        union = wordnik_list_scraper.set_operation("union", [first, second, third])
+        intersect = wordnik_list_scraper.set_operation("intersect", [second, first])
+
+        # Assert
+        self.assertEqual(diff, ["cherry"])
+        self.assertEqual(union, ["Apple", "banana", "cherry", "Damson"])
+        self.assertEqual(intersect, ["apple"])
+
+    def test_load_words_from_file_and_permalink(self):
+        # Arrange
+        pages = {"/lists/veg": list_page("Veg", ["carrot", "apple"])}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, "fruit.txt")
+            with open(filename, "w", encoding="utf-8") as f:
+                f.write("# Fruit\n\napple\nbanana")
+            with FixtureServer(pages) as server:
+
+                # Act
+                ret = wordnik_list_scraper.load_words(
+                    [filename, "veg"], base_url=server.url
+                )
+
+        # Assert
+        self.assertEqual(ret, [["apple", "banana"], ["carrot", "apple"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# End of file
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Unit tests for wordnik_output.py
+"""
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+import wordnik_output
+
+
+class TestIt(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmp_dir, "page.html")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_atomic_open_writes_on_success(self):
+        # Arrange
+        text = "<p>café</p>\n" * 100000
+
+        # Act
+        with wordnik_output.atomic_open(self.filename) as f:
+            f.write(text)
+            exists_before_close = os.path.exists(self.filename)
+
+        # Assert
+        self.assertFalse(exists_before_close)
+        with open(self.filename, encoding="utf-8") as f:
+            self.assertEqual(f.read(), text)
+        self.assertEqual(os.listdir(self.tmp_dir), ["page.html"])
+
+    def test_atomic_open_keeps_old_file_on_error(self):
+        # Arrange
+        with open(self.filename, "w") as f:
+            f.write("old")
+
+        # Act
+        with self.assertRaises(RuntimeError):
+            with wordnik_output.atomic_open(self.filename) as f:
+                f.write("new and truncat")
+                raise RuntimeError("crash")
+
+        # Assert
+        with open(self.filename) as f:
+            self.assertEqual(f.read(), "old")
+        self.assertEqual(os.listdir(self.tmp_dir), ["page.html"])
+
+    def test_atomic_open_gzip(self):
+        # Arrange
+        filename = self.filename + ".gz"
+
+        # Act
+        with wordnik_output.atomic_open(filename) as f:
+            f.write("<p>compressed</p>\n")
+
+        # Assert
+        with gzip.open(filename, "rt", encoding="utf-8") as f:
+            self.assertEqual(f.read(), "<p>compressed</p>\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# End of file
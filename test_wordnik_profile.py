@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Unit tests for wordnik_profile.py
+"""
+import argparse
+import io
+import json
+import unittest
+
+import wordnik_comment_scraper
+import wordnik_http
+import wordnik_list_scraper
+import wordnik_profile
+from fixture_server import FixtureServer, list_page, word_page
+
+PAGES = {
+    "/lists/fruit": list_page("Fruit", ["apple"]),
+    "/words/apple": word_page("apple", ("hugovk", "<b>apple</b>"), ("other", "no")),
+}
+
+
+class TestIt(unittest.TestCase):
+    def setUp(self):
+        wordnik_http.rate_limiter.interval = 0
+
+    def tearDown(self):
+        wordnik_profile.tracer = None
+
+    def test_span_disabled(self):
+        # Arrange
+        wordnik_profile.tracer = None
+
+        # Act
+        span = wordnik_profile.span("fetch", url="https://example.com")
+
+        # Assert
+        self.assertIs(span, wordnik_profile.NULL_SPAN)
+
+    def test_configure_without_options(self):
+        # Arrange
+        parser = argparse.ArgumentParser()
+        wordnik_profile.add_arguments(parser)
+        args = parser.parse_args([])
+
+        # Act
+        wordnik_profile.configure(args)
+
+        # Assert
+        self.assertIsNone(wordnik_profile.tracer)
+
+    def test_stages_recorded(self):
+        # Arrange
+        wordnik_profile.tracer = wordnik_profile.Tracer()
+
+        # Act
+        with FixtureServer(PAGES) as server:
+            wordnik_list_scraper.scrape_list_entries("fruit", server.url)
+            wordnik_comment_scraper.scrape_and_record("apple", "hugovk", server.url)
+
+        # Assert
+        summary = {row[0]: row for row in wordnik_profile.tracer.summary()}
+        self.assertEqual(summary["fetch"][1], 2)
+        self.assertEqual(summary["list"][1], 1)
+        self.assertEqual(summary["word"][1], 1)
+        self.assertIn("parse", summary)
+        self.assertIn("extract", summary)
+
+    def test_chrome_trace(self):
+        # Arrange
+        tracer = wordnik_profile.tracer = wordnik_profile.Tracer()
+        with wordnik_profile.span("word", word="apple"):
+            with wordnik_profile.span("parse", word="apple"):
+                pass
+
+        # Act
+        trace = json.loads(json.dumps(tracer.chrome_trace()))
+
+        # Assert
+        events = trace["traceEvents"]
+        self.assertEqual([event["name"] for event in events], ["parse", "word"])
+        self.assertEqual(events[0]["args"], {"word": "apple"})
+        self.assertEqual(events[0]["ph"], "X")
+        self.assertGreaterEqual(events[0]["ts"], events[1]["ts"])
+        self.assertLessEqual(events[0]["dur"], events[1]["dur"])
+
+    def test_print_summary(self):
+        # Arrange
+        tracer = wordnik_profile.tracer = wordnik_profile.Tracer()
+        with wordnik_profile.span("render"):
+            pass
+        out = io.StringIO()
+
+        # Act
+        tracer.print_summary(out)
+
+        # Assert
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith("Profile: "))
+        self.assertEqual(lines[2].split()[:2], ["render", "1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# End of file
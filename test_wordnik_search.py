@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Unit tests for wordnik_search.py
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import wordnik_search
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PAGES = ["new-to-me--2018.html", "words-new-to-me--2015.html"]
+
+
+class TestIt(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        for page in PAGES:
+            shutil.copy(os.path.join(HERE, "output", page), self.directory)
+
+    def test_page_entries(self):
+        # Arrange
+        with open(os.path.join(self.directory, PAGES[0]), encoding="utf-8") as f:
+            html = f.read()
+
+        # Act
+        entries = wordnik_search.page_entries(html)
+
+        # Assert
+        entry = next(e for e in entries if e["word"] == "apology tour")
+        self.assertEqual(entry["pos"], "n.")
+        self.assertEqual(entry["source"], "The Guardian, 10 April 2018")
+        self.assertIn("Zuckerberg", entry["quote"])
+        self.assertEqual(entry["author"], "hugovk")
+        self.assertEqual(entry["timestamp"], "2018-08-03")
+
+    def test_index_and_query_across_pages(self):
+        # Arrange
+        wordnik_search.index_pages(self.directory)
+
+        # Act
+        apology = wordnik_search.search('"apology tour"', self.directory)
+        beard = wordnik_search.search("achievement beard", self.directory)
+
+        # Assert
+        self.assertEqual(apology[0]["word"], "apology tour")
+        self.assertEqual(apology[0]["page"], PAGES[0])
+        self.assertEqual(beard[0]["word"], "achievement beard")
+        self.assertEqual(beard[0]["page"], PAGES[1])
+
+    def test_invalid_query_syntax_searches_plain_words(self):
+        # Arrange
+        wordnik_search.index_pages(self.directory)
+
+        # Act
+        ret = wordnik_search.search('Zuckerberg "', self.directory)
+
+        # Assert
+        self.assertEqual(ret[0]["word"], "apology tour")
+
+    def test_empty_query(self):
+        # Arrange
+        wordnik_search.index_pages(self.directory)
+
+        # Act
+        empty = wordnik_search.search("", self.directory)
+        blank = wordnik_search.search("  ", self.directory)
+
+        # Assert
+        self.assertEqual(empty, [])
+        self.assertEqual(blank, [])
+
+    def test_query_before_index(self):
+        # Act / Assert
+        with self.assertRaises(FileNotFoundError):
+            wordnik_search.search("apology", self.directory)
+        self.assertFalse(
+            os.path.exists(os.path.join(self.directory, wordnik_search.DB_NAME))
+        )
+
+    def test_index_is_incremental(self):
+        # Arrange
+        first = wordnik_search.index_pages(self.directory)
+        page = os.path.join(self.directory, PAGES[1])
+        with open(page, "a", encoding="utf-8") as f:
+            f.write("\n")
+        os.remove(os.path.join(self.directory, PAGES[0]))
+
+        # Act
+        second = wordnik_search.index_pages(self.directory)
+        third = wordnik_search.index_pages(self.directory)
+
+        # Assert
+        self.assertEqual(first, PAGES)
+        self.assertEqual(second, [PAGES[1]])
+        self.assertEqual(third, [])
+        self.assertEqual(wordnik_search.search("apology", self.directory), [])
+        shards = os.listdir(os.path.join(self.directory, wordnik_search.SHARD_DIR))
+        self.assertEqual(shards, ["words-new-to-me--2015.json"])
+
+    def test_shard_index(self):
+        # Arrange
+        wordnik_search.index_pages(self.directory)
+        shard_file = os.path.join(
+            self.directory, wordnik_search.SHARD_DIR, "new-to-me--2018.json"
+        )
+
+        # Act
+        with open(shard_file, encoding="utf-8") as f:
+            shard = json.load(f)
+
+        # Assert
+        self.assertEqual(shard["title"], "New to me (2018)")
+        matches = [shard["entries"][i]["word"] for i in shard["index"]["zuckerberg"]]
+        self.assertIn("apology tour", matches)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# End of file
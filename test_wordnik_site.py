@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Unit tests for wordnik_site.py
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import wordnik_http
+import wordnik_site
+from fixture_server import FixtureServer, list_page, word_page
+
+PAGES = {
+    "/lists/fruit": list_page("Fruit", ["apple", "banana"]),
+    "/lists/veg": list_page("Veg", ["carrot"]),
+}
+for word in ["apple", "banana", "carrot"]:
+    PAGES["/words/" + word] = word_page(word, ("hugovk", f"<b>{word}</b>"))
+
+MANIFEST = {
+    "output": "site",
+    "heading": "Lists<br>of Words",
+    "pages": [
+        {"list": "fruit", "user": "hugovk", "title": "Fruit (2019)", "year": 2019},
+        {"list": "veg", "user": "hugovk", "subtitle": "Greens", "year": 2018},
+    ],
+}
+
+
+class TestIt(unittest.TestCase):
+    def setUp(self):
+        wordnik_http.rate_limiter.interval = 0
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        filename = os.path.join(tmp_dir, "site.json")
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(MANIFEST, f)
+        self.manifest = wordnik_site.load_manifest(filename)
+        self.output = os.path.join(tmp_dir, "site")
+
+    def test_build_skips_unchanged_pages(self):
+        # Arrange
+        pages = dict(PAGES)
+        with FixtureServer(pages) as server:
+
+            # Act
+            first = list(wordnik_site.build(self.manifest, 2, base_url=server.url))
+            second = list(wordnik_site.build(self.manifest, 2, base_url=server.url))
+            pages["/lists/veg"] = list_page("Veg", {"carrot": 3})
+            third = list(wordnik_site.build(self.manifest, 1, base_url=server.url))
+
+        # Assert
+        self.assertEqual(
+            first, [("fruit", 2, True), ("veg", 1, True), ("index", 0, True)]
+        )
+        self.assertEqual(
+            second, [("fruit", 0, False), ("veg", 0, False), ("index", 0, False)]
+        )
+        self.assertEqual(
+            third, [("fruit", 0, False), ("veg", 1, False), ("index", 0, False)]
+        )
+
+    def test_build_titles_and_index(self):
+        # Arrange
+        with FixtureServer(PAGES) as server:
+
+            # Act
+            list(wordnik_site.build(self.manifest, 1, base_url=server.url))
+
+        # Assert
+        with open(os.path.join(self.output, "fruit.html"), encoding="utf-8") as f:
+            fruit = f.read()
+        with open(os.path.join(self.output, "veg.html"), encoding="utf-8") as f:
+            veg = f.read()
+        with open(os.path.join(self.output, "index.html"), encoding="utf-8") as f:
+            index = f.read()
+        self.assertIn("<h1>Fruit (2019)</h1>", fruit)
+        self.assertIn("<b>banana</b>", fruit)
+        self.assertIn("<h1>Veg</h1>\n\n<h2>Greens</h2>", veg)
+        self.assertIn("<title>Lists of Words</title>", index)
+        self.assertLess(index.index("<h2>2019</h2>"), index.index("<h2>2018</h2>"))
+        self.assertIn('<li><a href="veg.html">hugovk - Veg</a>', index)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# End of file
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Unit tests for wordnik_sort.py
+"""
+import os
+import random
+import tempfile
+import unittest
+
+import wordnik_sort
+
+
+class TestIt(unittest.TestCase):
+    def test_sort_words_non_ascii(self):
+        # Arrange
+        words = ["egg", "Éclair", "résumé", "Zebra", "resume", "eclair", "straße"]
+
+        # Act
+        ret = wordnik_sort.sort_words(words)
+
+        # Assert
+        self.assertEqual(
+            ret, ["eclair", "Éclair", "egg", "resume", "résumé", "straße", "Zebra"]
+        )
+
+    def test_fold(self):
+        # Arrange
+        composed = "café"
+        decomposed = "cafe\u0301"
+
+        # Act / Assert
+        self.assertEqual(wordnik_sort.fold("STRASSE"), wordnik_sort.fold("straße"))
+        self.assertEqual(wordnik_sort.fold(composed), wordnik_sort.fold(decomposed))
+        self.assertNotEqual(wordnik_sort.fold("café"), wordnik_sort.fold("cafe"))
+
+    def test_sort_lines_in_chunks_matches_sort_words(self):
+        # Arrange
+        rng = random.Random(0)
+        words = [
+            "".join(rng.choice("aAbBéÉz") for _ in range(rng.randrange(1, 6)))
+            for _ in range(1000)
+        ]
+        lines = [word + "\n" for word in words] + ["\n"]
+
+        # Act
+        ret = list(wordnik_sort.sort_lines(lines, chunk_size=64))
+
+        # Assert
+        self.assertEqual(ret, wordnik_sort.sort_words(words))
+
+    def test_sort_file(self):
+        # Arrange
+        with tempfile.TemporaryDirectory() as tmpdir:
+            infile = os.path.join(tmpdir, "words.txt")
+            outfile = os.path.join(tmpdir, "sorted.txt")
+            with open(infile, "w", encoding="utf-8") as f:
+                f.write("cherry\nApple\nbanana\n")
+
+            # Act
+            wordnik_sort.sort_file(infile, outfile, chunk_size=1)
+
+            # Assert
+            with open(outfile, encoding="utf-8") as f:
+                self.assertEqual(f.read(), "Apple\nbanana\ncherry\n")
+            self.assertEqual(sorted(os.listdir(tmpdir)), ["sorted.txt", "words.txt"])
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+# End of file
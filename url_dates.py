@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Work out a citation's date from its URL.
+
+Common URL shapes are matched with precompiled patterns: /YYYY/MM/DD/,
+/YYYY/mon/DD/, YYYYMMDD slugs and Twitter status IDs, which embed their
+creation time. Only URLs matching none of these go through dateutil's much
+slower fuzzy parsing.
+"""
+import datetime
+import functools
+import re
+
+MONTHS = {
+    month: number
+    for number, month in enumerate(
+        "jan feb mar apr may jun jul aug sep oct nov dec".split(), start=1
+    )
+}
+
+# Milliseconds since the Unix epoch when Twitter started using snowflake IDs
+TWITTER_EPOCH = 1288834974657
+# IDs below this were issued sequentially and carry no timestamp
+FIRST_SNOWFLAKE = 29700859247
+
+TWITTER_RE = re.compile(
+    r"//(?:www\.|mobile\.)?(?:twitter|x)\.com/[^/]+/status(?:es)?/(\d+)", re.I
+)
+YYYY_MM_DD_RE = re.compile(r"/((?:19|20)\d\d)/(\d\d?)/(\d\d?)(?:[/_.-]|$)")
+YYYY_MON_DD_RE = re.compile(
+    r"/((?:19|20)\d\d)/(" + "|".join(MONTHS) + r")[a-z]*/(\d\d?)(?:[/_.-]|$)", re.I
+)
+YYYYMMDD_RE = re.compile(r"(?<!\d)((?:19|20)\d\d)(\d\d)(\d\d)(?!\d)")
+
+
+def from_twitter(url):
+    match = TWITTER_RE.search(url)
+    if match:
+        snowflake = int(match.group(1))
+        if snowflake >= FIRST_SNOWFLAKE:
+            return datetime.datetime.fromtimestamp(
+                ((snowflake >> 22) + TWITTER_EPOCH) / 1000, datetime.timezone.utc
+            )
+    return None
+
+
+def from_pattern(pattern, url, month=int):
+    for match in pattern.finditer(url):
+        year, mon, day = match.groups()
+        try:
+            return datetime.datetime(int(year), month(mon), int(day))
+        except ValueError:
+            continue
+    return None
+
+
+def from_dateutil(url):
+    from dateutil.parser import parse  # pip install python-dateutil
+
+    try:
+        return parse(url, fuzzy=True)
+    except (ValueError, OverflowError):
+        return None
+
+
+@functools.lru_cache(maxsize=65536)
+def date_from_url(url):
+    """Get the date from the URL as a datetime, or None"""
+    return (
+        from_twitter(url)
+        or from_pattern(YYYY_MM_DD_RE, url)
+        or from_pattern(YYYY_MON_DD_RE, url, month=lambda m: MONTHS[m[:3].lower()])
+        or from_pattern(YYYYMMDD_RE, url)
+        or from_dateutil(url)
+    )
+
+
+# End of file
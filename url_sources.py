@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Work out the name of a citation's source from its URL.
+
+Known sites are looked up in a domain-to-source mapping file (sources.json),
+matching the hostname or any of its parent domains. A source containing
+{user} gets the first part of the URL path, for example a Twitter handle.
+Anything else is named after its registered domain, using the public suffix
+list snapshot bundled with tldextract so nothing is fetched over the network.
+"""
+import functools
+import json
+import os
+import re
+from urllib.parse import urlsplit
+
+DEFAULT_SOURCES = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "sources.json"
+)
+# The network location and path of a URL, cheaper than a full urlsplit
+URL_RE = re.compile(r"(?:[a-zA-Z][a-zA-Z0-9+.-]*:)?//([^/?#]*)([^?#]*)")
+
+
+def load_sources(*filenames):
+    """Load and merge domain-to-source mappings, later files winning"""
+    sources = {}
+    for filename in filenames:
+        with open(filename, encoding="utf-8") as f:
+            sources.update((k.lower(), v) for k, v in json.load(f).items())
+    return sources
+
+
+@functools.lru_cache(maxsize=None)
+def suffix_extractor():
+    """Return a tldextract extractor using only its bundled snapshot"""
+    import tldextract  # pip install tldextract
+
+    return tldextract.TLDExtract(suffix_list_urls=(), cache_dir=None)
+
+
+def name_from_domain(hostname):
+    """Make a source name from the hostname's registered domain"""
+    output = suffix_extractor()(hostname).domain
+
+    if output.startswith("the"):
+        output = "The " + output[3:]
+
+    return output.title()
+
+
+class SourceResolver:
+    """Resolve URLs to source names, caching the result per network location,
+    so only the first URL from each site is fully parsed"""
+
+    def __init__(self, sources=None, cache_size=4096):
+        if sources is None:
+            sources = load_sources(DEFAULT_SOURCES)
+        self.sources = sources
+        self.for_netloc = functools.lru_cache(maxsize=cache_size)(self._for_netloc)
+
+    def _for_netloc(self, netloc):
+        hostname = (urlsplit("//" + netloc).hostname or "").rstrip(".")
+        labels = hostname.split(".")
+        for i in range(len(labels) - 1):
+            source = self.sources.get(".".join(labels[i:]))
+            if source is not None:
+                return source
+        return name_from_domain(hostname)
+
+    def resolve(self, url):
+        """Get the source from the URL"""
+        netloc, path = URL_RE.search(url if "//" in url else "//" + url).groups()
+        source = self.for_netloc(netloc)
+        if "{user}" in source:
+            user = path.strip("/").split("/")[0]
+            source = source.format(user=user)
+        return source
+
+
+@functools.lru_cache(maxsize=None)
+def default_resolver():
+    return SourceResolver()
+
+
+def source_from_url(url):
+    """Get the source from the URL using the default mapping file"""
+    return default_resolver().resolve(url)
+
+
+# End of file
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+"""
+Async client for the parts of the Wordnik v4 API used by
+wordnik_list_downloader.py.
+"""
+import asyncio
+import json
+import os
+import time
+from urllib.error import HTTPError
+from urllib.parse import quote, urlencode
+
+import wordnik_http
+import wordnik_profile
+
+API_URL = "https://api.wordnik.com/v4"
+PAGE_SIZE = 1000
+TOKEN_LIFETIME = 24 * 60 * 60  # seconds
+DEFAULT_TOKEN_CACHE = os.path.join(wordnik_http.DEFAULT_CACHE_DIR, "token.json")
+
+
+class TokenCache:
+    """Keep an auth token and its expiry in a file only the user can read"""
+
+    def __init__(self, filename):
+        self.filename = filename
+
+    def load(self, username):
+        """Return the saved token for username, or None if none or expired"""
+        try:
+            with open(self.filename) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("username") != username or time.time() >= data.get("expires", 0):
+            return None
+        return data.get("token")
+
+    def save(self, username, token, expires):
+        directory = os.path.dirname(self.filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_filename = self.filename + ".tmp"
+        fd = os.open(tmp_filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump({"username": username, "token": token, "expires": expires}, f)
+        os.replace(tmp_filename, self.filename)
+
+
+class WordnikClient:
+    """Make Wordnik API calls over pooled keep-alive connections,
+    with at most `concurrency` requests in flight at once"""
+
+    def __init__(
+        self,
+        api_key,
+        base_url=API_URL,
+        concurrency=4,
+        page_size=PAGE_SIZE,
+        token_cache=None,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.page_size = page_size
+        self.token_cache = token_cache
+        self.pool = wordnik_http.ConnectionPool()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._login_lock = asyncio.Lock()
+        self._credentials = None
+        self._token = None
+        self._token_expires = 0
+
+    async def get(self, path, params=None, token=None):
+        """GET an API path and return the decoded JSON"""
+        params = dict(params or {}, api_key=self.api_key)
+        url = self.base_url + path + "?" + urlencode(params)
+        headers = {"Accept": "application/json"}
+        if token:
+            headers["auth_token"] = token
+        loop = asyncio.get_running_loop()
+        async with self._semaphore:
+            final_url, status, reason, headers, body = await loop.run_in_executor(
+                None, self._fetch, url, headers
+            )
+        if status >= 300:
+            raise HTTPError(final_url, status, reason, headers, None)
+        with wordnik_profile.span("parse", path=path):
+            return json.loads(body)
+
+    def _fetch(self, url, headers):
+        # Timed in the worker thread, so waiting for the semaphore isn't counted
+        with wordnik_profile.span("fetch", url=url.partition("?")[0]):
+            return self.pool.get(url, headers)
+
+    async def authenticate(self, username, password, rejected=None):
+        """Return an auth token, reusing the last one, from memory or the
+        token cache, until it expires or the API rejects it"""
+        async with self._login_lock:
+            if self._token and self._token != rejected:
+                if time.time() < self._token_expires:
+                    return self._token
+            if self.token_cache and not rejected:
+                token = self.token_cache.load(username)
+                if token:
+                    self._token = token
+                    self._token_expires = time.time() + TOKEN_LIFETIME
+                    return token
+
+            path = "/account.json/authenticate/" + quote(username, safe="")
+            result = await self.get(path, {"password": password})
+            self._token = result["token"]
+            self._token_expires = time.time() + TOKEN_LIFETIME
+            if self.token_cache:
+                self.token_cache.save(username, self._token, self._token_expires)
+            return self._token
+
+    async def login(self, username, password):
+        """Remember the credentials for authed_get and return a token"""
+        self._credentials = (username, password)
+        return await self.authenticate(username, password)
+
+    async def authed_get(self, path, params=None):
+        """GET an API path which needs a token, logging in again once if
+        the API rejects the current one"""
+        token = await self.authenticate(*self._credentials)
+        try:
+            return await self.get(path, params, token)
+        except HTTPError as e:
+            if e.code != 401:
+                raise
+        token = await self.authenticate(*self._credentials, rejected=token)
+        return await self.get(path, params, token)
+
+    async def list_words(self, permalink):
+        """Return all words on one of the user's lists, a page at a time"""
+        path = "/wordList.json/" + quote(permalink, safe="") + "/words"
+        words = []
+        skip = 0
+        with wordnik_profile.span("list", list=permalink):
+            while True:
+                params = {"skip": skip, "limit": self.page_size}
+                results = await self.authed_get(path, params)
+                words.extend(result["word"] for result in results)
+                if len(results) < self.page_size:
+                    return words
+                skip += self.page_size
+
+    async def download_lists(self, permalinks):
+        """Return a dict of permalink: words, downloading lists concurrently"""
+        results = await asyncio.gather(
+            *(self.list_words(permalink) for permalink in permalinks)
+        )
+        return dict(zip(permalinks, results))
+
+
+async def download(
+    credentials,
+    permalinks,
+    base_url=API_URL,
+    concurrency=4,
+    page_size=PAGE_SIZE,
+    token_cache=None,
+):
+    """Log in and download lists. Return a dict of permalink: words"""
+    client = WordnikClient(
+        credentials["wordnik_api_key"], base_url, concurrency, page_size, token_cache
+    )
+    await client.login(credentials["wordnik_username"], credentials["wordnik_password"])
+    return await client.download_lists(permalinks)
+
+
+# End of file
@@ -5,56 +5,104 @@ Download comments (from a user) on a word (or list thereof).
 Scrapes because no comment fetching via API.
 """
 import argparse
+import contextlib
+import datetime
+import hashlib
+import json
+import os
+import re
 import sys
-from urllib.parse import quote, urljoin
-from urllib.request import urlopen
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from string import Template
+from urllib.parse import quote, unquote, urljoin
 
-from bs4 import BeautifulSoup, Comment  # pip install BeautifulSoup4
+import wordnik_daemon
+import wordnik_http
+import wordnik_output
+import wordnik_profile
 
+WORDNIK_URL = "https://wordnik.com"
+LINK_BASE_URL = "https://www.wordnik.com"
+# List pages don't show when a word gets a new comment, so incremental
+# updates re-scrape each word once in every period this long anyway
+REFRESH_AFTER = 7 * 24 * 60 * 60  # seconds
 
-def print_html_header(user, slug, title, subtitle):
-    print(
-        """<!doctype html>
+# Each word's comments are in a <div id="{word}"> starting on its own line
+SECTION_RE = re.compile(r'^<div id="([^"]*)">$', re.MULTILINE)
+
+
+# Page templates, filled in by render_header() and render_index()
+PAGE_HEAD = Template(
+    """<!doctype html>
 <html lang="en">
   <head>
     <meta charset="utf-8">
-    <meta http-equiv="X-UA-Compatible" content="IE=edge">"""
-    )
-    if title:
-        print(f"    <title>{title}</title>")
-    print(
-        """    <meta name="viewport" content="width=device-width, initial-scale=1">
+    <meta http-equiv="X-UA-Compatible" content="IE=edge">
+${title_tag}    <meta name="viewport" content="width=device-width, initial-scale=1">
     <link rel="stylesheet" href="style.css">
   </head>
   <body>
+
+${headings}"""
+)
+TITLE_TAG = Template("    <title>${title}</title>\n")
+H1 = Template("<h1>${title}</h1>\n\n")
+H2 = Template("<h2>${subtitle}</h2>\n\n")
+COMPILED_BY = Template(
+    """<h3>Compiled<br>by<br><a
+        href="https://www.wordnik.com/users/${user}">${user}</a><br>on
+        <br><a href="https://www.wordnik.com/lists/${slug}"><img
+        alt="Wordnik" src="wordnik.png" width="100"></h3>
+
 """
-    )
+)
+INDEX_ITEM = Template('<li><a href="#${word}">${word}</a>\n')
+PAGE_FOOT = "\n  </body>\n</html>\n"
+
+
+def render_header(user, slug, title, subtitle):
+    headings = ""
     if title:
-        print(f"<h1>{title}</h1>")
-        print("")
+        headings += H1.substitute(title=title)
     if subtitle:
-        print(f"<h2>{subtitle}</h2>")
-        print("")
+        headings += H2.substitute(subtitle=subtitle)
     if user and slug:
-        print(
-            """<h3>Compiled<br>by<br><a
-        href="https://www.wordnik.com/users/{user}">{user}</a><br>on
-        <br><a href="https://www.wordnik.com/lists/{slug}"><img
-        alt="Wordnik" src="wordnik.png" width="100"></h3>
-""".format(
-                user=user, slug=slug, title=title, subtitle=subtitle
-            )
-        )
+        headings += COMPILED_BY.substitute(user=user, slug=slug)
+    return PAGE_HEAD.substitute(
+        title_tag=TITLE_TAG.substitute(title=title) if title else "",
+        headings=headings,
+    )
+
+
+def render_index(words):
+    items = "".join(INDEX_ITEM.substitute(word=word) for word in words)
+    return '<ol class="index">\n' + items + "</ol>\n"
 
 
-def print_html_footer():
-    print(
-        """
-  </body>
-</html>"""
+def render_page(user, slug, title, subtitle, words, sections):
+    """Return a whole page, given each word's section of comments"""
+    return (
+        render_header(user, slug, title, subtitle)
+        + render_index(words)
+        + "".join(sections[word] for word in words)
+        + PAGE_FOOT
     )
 
 
+def print_html_header(user, slug, title, subtitle, file=None):
+    print(render_header(user, slug, title, subtitle), end="", file=file)
+
+
+def print_html_index(words, file=None):
+    print(render_index(words), end="", file=file)
+
+
+def print_html_footer(file=None):
+    print(PAGE_FOOT, end="", file=file)
+
+
 def fix_relative_links(soup, base_url):
     """ Change all relative links to absolute links """
     a_tags = soup.find_all("a", href=True)
@@ -64,37 +112,346 @@ def fix_relative_links(soup, base_url):
     return soup
 
 
-def scrape_word_comments(slug, user=None):
+def extract_comment(comment, user=None, base_url=LINK_BASE_URL):
+    """Return the cleaned-up body of an <li class="comment">, or None if
+    it's not by user. Finds the author and body, strips report links and
+    HTML comments, and makes links absolute in one walk over the tree"""
+    from bs4 import Comment  # pip install BeautifulSoup4
+
+    body = None
+    span_author = None
+    author_checked = not user
+    unwanted = []
+
+    for node in comment.descendants:
+        name = node.name
+        if name is None:
+            # Remove HTML comments:
+            # <!-- you won't flag your own comments as spam -->
+            if isinstance(node, Comment):
+                unwanted.append(node)
+            continue
+
+        classes = node.get("class") or ()
+        if name == "a":
+            href = node.get("href")
+            if not author_checked and href is not None and span_author is not None:
+                if span_author in node.parents:
+                    if not "/users/" + user == href.lower():
+                        return None
+                    author_checked = True
+            if "report_comment" in classes:
+                unwanted.append(node)
+            elif href is not None and href.startswith("/"):
+                node["href"] = urljoin(base_url, href)
+        elif name == "span" and span_author is None and "author" in classes:
+            span_author = node
+        elif name == "div" and body is None and "body" in classes:
+            body = node
+
+    if not author_checked:
+        # No author link, so can't be by user
+        return None
+
+    for node in unwanted:
+        if body in node.parents:
+            node.extract()
+    return body
+
+
+def scrape_word_comments(slug, user=None, base_url=WORDNIK_URL):
     # """Scrape a Wordnik word and return a list of comments"""
+    from bs4 import BeautifulSoup, SoupStrainer  # pip install BeautifulSoup4
+
     found = []
 
-    url = "https://wordnik.com/words/" + quote(slug.encode("utf8"), safe="")
-    page = urlopen(url)
-    soup = BeautifulSoup(page.read(), "lxml")
+    url = base_url + "/words/" + quote(slug.encode("utf8"), safe="")
+    page = wordnik_http.fetch(url)
+    with wordnik_profile.span("parse", word=slug):
+        strainer = SoupStrainer(id="commentsOnWord")
+        soup = BeautifulSoup(page, "lxml", parse_only=strainer)
 
-    ul_comments = soup.find(id="commentsOnWord")
-    li_comments = ul_comments.find_all("li", class_="comment")
+    with wordnik_profile.span("extract", word=slug):
+        ul_comments = soup.find(id="commentsOnWord")
+        li_comments = ul_comments.find_all("li", class_="comment")
 
-    for comment in li_comments:
-        if user:
-            span_author = comment.find_all("span", class_="author")[0]
-            a = span_author.find_all("a", href=True)[0]
-            if not "/users/" + user == a["href"].lower():
-                continue
+        for comment in li_comments:
+            body = extract_comment(comment, user)
+            if body is not None:
+                found.append(body)
+    return found
 
-        body = comment.find_all("div", class_="body")[0]
-        # Remove some bits
-        for a in body.findAll("a", "report_comment"):
-            a.extract()
-        # Remove HTML comments:
-        # <!-- you won't flag your own comments as spam -->
-        for html_comment in body.findAll(text=lambda text: isinstance(text, Comment)):
-            html_comment.extract()
 
-        body = fix_relative_links(body, "https://www.wordnik.com")
+class Journal:
+    """Append-only JSONL record of each word's scraped comments, so an
+    interrupted run can carry on where it stopped. Syncs to disk every
+    `sync_every` words or `sync_interval` seconds, not after every write.
+    Raises FileExistsError rather than overwrite the journal of an
+    interrupted run, unless told to resume or restart"""
 
-        found.append(body)
-    return found
+    def __init__(
+        self, filename, resume=False, restart=False, sync_every=50, sync_interval=5.0
+    ):
+        self.filename = filename
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.done = self.load() if resume else {}
+        mode = "a" if resume else "w" if restart else "x"
+        self._f = open(filename, mode, encoding="utf-8")
+        if self._f.tell():
+            # Start on a new line after any record cut off by a crash
+            self._f.write("\n")
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Return a dict of word: list of comment HTML from the journal"""
+        done = {}
+        try:
+            with open(self.filename, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Cut off by a crash
+                        continue
+                    done[record["word"]] = record["comments"]
+        except FileNotFoundError:
+            pass
+        return done
+
+    def record(self, word, comments):
+        line = json.dumps({"word": word, "comments": [str(c) for c in comments]})
+        with self._lock:
+            self._f.write(line + "\n")
+            self._unsynced += 1
+            if (
+                self._unsynced >= self.sync_every
+                or time.monotonic() - self._last_sync >= self.sync_interval
+            ):
+                self._sync()
+
+    def _sync(self):
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self, remove=False):
+        """Close the journal, deleting it if the run is complete"""
+        with self._lock:
+            self._sync()
+            self._f.close()
+        if remove:
+            os.remove(self.filename)
+
+
+def scrape_and_record(word, user=None, base_url=WORDNIK_URL, journal=None):
+    """Scrape a word's comments, unless already done in the journal,
+    and add them to the journal"""
+    if journal and word in journal.done:
+        return journal.done[word]
+    with wordnik_profile.span("word", word=word):
+        if wordnik_daemon.client:
+            comments = wordnik_daemon.client.word_comments(word, user, base_url)
+        else:
+            comments = scrape_word_comments(word, user, base_url)
+    if journal:
+        journal.record(word, comments)
+    return comments
+
+
+def comment_record(word, body):
+    """Return a dict with the word, author, timestamp, HTML and plain text
+    of a scraped comment"""
+    if isinstance(body, str):
+        # Resumed from a journal
+        from bs4 import BeautifulSoup  # pip install BeautifulSoup4
+
+        body = BeautifulSoup(body, "lxml").find("div")
+    author = body.find("span", class_="author")
+    date = body.find("abbr", title=True)
+    timestamp = date["title"] if date else None
+    try:
+        timestamp = datetime.datetime.strptime(timestamp, "%B %d, %Y").date()
+        timestamp = timestamp.isoformat()
+    except (TypeError, ValueError):
+        pass
+
+    # The text is everything except the byline and date
+    parts = []
+    for child in body.children:
+        classes = child.get("class", []) if child.name else []
+        if child.name == "p" and ("byline" in classes or "meta" in classes):
+            continue
+        parts.append(child.get_text(" ") if child.name else str(child))
+    text = " ".join(" ".join(parts).split())
+
+    return {
+        "word": word,
+        "author": author.get_text(strip=True) if author else None,
+        "timestamp": timestamp,
+        "html": str(body),
+        "text": text,
+    }
+
+
+def scrape_words_comments(
+    words, user=None, concurrency=1, base_url=WORDNIK_URL, journal=None
+):
+    """Scrape many words, up to `concurrency` at a time.
+    Yield (word, comments) in the same order as words"""
+    if concurrency <= 1:
+        for word in words:
+            yield word, scrape_and_record(word, user, base_url, journal)
+        return
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = executor.map(
+            lambda word: scrape_and_record(word, user, base_url, journal), words
+        )
+        yield from zip(words, results)
+
+
+def scrape_list_comments(
+    wordlist, user=None, concurrency=1, base_url=WORDNIK_URL, journal=None
+):
+    """Start scraping each word's comments as soon as it comes from the
+    (word, metadata) iterator, without waiting for the rest of the list.
+    Return the sorted words and a generator of (word, comments) in that order.
+    If the generator is closed or raises, fetches not yet started are
+    cancelled"""
+    from wordnik_sort import sort_words
+
+    def cancel():
+        for future in pending.values():
+            future.cancel()
+
+    executor = ThreadPoolExecutor(max_workers=max(concurrency, 1))
+    pending = {}
+    try:
+        for word, metadata in wordlist:
+            pending[word] = executor.submit(
+                scrape_and_record, word, user, base_url, journal
+            )
+    except BaseException:
+        cancel()
+        raise
+    finally:
+        # Let the queued fetches carry on in the background
+        executor.shutdown(wait=False)
+
+    def results():
+        try:
+            for word in words:
+                yield word, pending[word].result()
+        finally:
+            cancel()
+
+    words = sort_words(pending)
+    return words, results()
+
+
+def format_word_section(word, comments):
+    """Return the HTML section holding a word's comments"""
+    return f'<div id="{word}">\n' + "".join(f"{c}\n" for c in comments) + "</div>\n"
+
+
+def split_sections(html):
+    """Split a page written by this script into a dict of word: section"""
+    starts = [(m.start(), m.group(1)) for m in SECTION_RE.finditer(html)]
+    ends = [start for start, word in starts[1:]] + [html.rfind("\n  </body>")]
+    return {word: html[start:end] for (start, word), end in zip(starts, ends)}
+
+
+def fingerprint(section):
+    return hashlib.sha1(section.encode("utf-8")).hexdigest()
+
+
+def refresh_due(word, scraped, now, refresh_after):
+    """Return whether a word last scraped at `scraped` is due to be scraped
+    again. Each word's refresh period starts at an offset from a hash of
+    the word, so the words of a list scraped together come due on different
+    days, rather than all at once"""
+    if refresh_after <= 0:
+        return True
+    digest = hashlib.sha1(word.encode("utf-8")).digest()
+    offset = int.from_bytes(digest[:8], "big") % refresh_after
+    return (now + offset) // refresh_after != (scraped + offset) // refresh_after
+
+
+def update_page(
+    filename,
+    slug,
+    user,
+    subtitle,
+    concurrency=1,
+    base_url=WORDNIK_URL,
+    title=None,
+    refresh_after=REFRESH_AFTER,
+):
+    """Rebuild a list's page, only re-scraping words which are new, whose
+    list entry has changed since the last run (the number of lists it's on,
+    or who added it), whose section of the page has been edited, or whose
+    refresh is due (see refresh_due), according to the manifest saved next
+    to the page. The page is only rewritten if it has
+    changed. The title defaults to the list's.
+    Return the number of words scraped"""
+    from wordnik_list_scraper import scrape_list_entries
+    from wordnik_sort import sort_words
+
+    manifest_file = filename + ".manifest.json"
+    try:
+        with open(manifest_file, encoding="utf-8") as f:
+            manifest = json.load(f)["words"]
+    except (OSError, ValueError, KeyError):
+        manifest = {}
+    try:
+        with open(filename, encoding="utf-8") as f:
+            old_html = f.read()
+    except FileNotFoundError:
+        old_html = ""
+    sections = split_sections(old_html)
+
+    list_title, entries = scrape_list_entries(slug, base_url)
+    title = title or list_title
+    metadata = dict(entries)
+    words = sort_words(metadata)
+
+    now = time.time()
+
+    def is_stale(word):
+        entry = manifest.get(word, {})
+        return (
+            word not in sections
+            or entry.get("metadata") != metadata[word]
+            or entry.get("fingerprint") != fingerprint(sections[word])
+            or refresh_due(word, entry.get("scraped", 0), now, refresh_after)
+        )
+
+    stale = [word for word in words if is_stale(word)]
+    for word, comments in scrape_words_comments(stale, user, concurrency, base_url):
+        sections[word] = format_word_section(word, comments)
+
+    with wordnik_profile.span("render", list=slug):
+        html = render_page(user, slug, title, subtitle, words, sections)
+    if html != old_html:
+        with wordnik_output.atomic_open(filename) as f:
+            f.write(html)
+
+    scraped = set(stale)
+    manifest = {
+        word: {
+            "metadata": metadata[word],
+            "fingerprint": fingerprint(sections[word]),
+            "scraped": now if word in scraped else manifest[word]["scraped"],
+        }
+        for word in words
+    }
+    with wordnik_output.atomic_open(manifest_file) as f:
+        json.dump({"list": slug, "words": manifest}, f, indent=1, sort_keys=True)
+    return len(stale)
 
 
 if __name__ == "__main__":
@@ -124,49 +481,137 @@ if __name__ == "__main__":
         help="Subtitle for HTML output",
         default="A Lexicon<br>of Newish Words<br>That Caught My Eye<br>in 2018",
     )
-    # parser.add_argument(
-    #     '-o', '--outfile',
-    #     help="Save to this file. Default: <slug>.txt")
+    parser.add_argument(
+        "-o",
+        "--outfile",
+        help="Save to this file, gzipped if it ends with .gz. Default: stdout",
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Number of word pages to fetch in parallel",
+    )
+    parser.add_argument(
+        "-i",
+        "--incremental",
+        metavar="FILE",
+        help="Update this HTML file in place, only re-scraping words that are "
+        "new, whose number of lists or adder has changed since the last run, "
+        "or which are due a --refresh-after",
+    )
+    parser.add_argument(
+        "--refresh-after",
+        type=float,
+        default=REFRESH_AFTER / 86400,
+        metavar="DAYS",
+        help="With --incremental, re-scrape each word once in this many days, "
+        "a few words each run, to pick up new comments. 0 to re-scrape them all",
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=["html", "jsonl"],
+        default="html",
+        help="html for a page, jsonl for one JSON record per comment",
+    )
+    parser.add_argument(
+        "--journal",
+        help="Record each finished word in this file while running. "
+        "Default: <outfile, list or word>.journal",
+    )
+    journal_group = parser.add_mutually_exclusive_group()
+    journal_group.add_argument(
+        "-r",
+        "--resume",
+        action="store_true",
+        help="Carry on from the journal of an interrupted run",
+    )
+    journal_group.add_argument(
+        "--restart",
+        action="store_true",
+        help="Discard the journal of an interrupted run and start again",
+    )
+    wordnik_http.add_arguments(parser)
+    wordnik_daemon.add_arguments(parser)
+    wordnik_profile.add_arguments(parser)
     args = parser.parse_args()
 
+    wordnik_http.configure(args)
+    wordnik_daemon.connect(args)
+    wordnik_profile.configure(args)
+
     if args.word and args.list:
         sys.exit("Please give just a word or list, not both")
     elif not args.word and not args.list:
         sys.exit("Please give a word or list")
 
+    if args.incremental:
+        if not args.list:
+            sys.exit("Please give a list to update incrementally")
+        scraped = update_page(
+            args.incremental,
+            args.list,
+            args.user,
+            args.subtitle,
+            args.concurrency,
+            refresh_after=args.refresh_after * 86400,
+        )
+        print(f"Scraped {scraped} words for {args.incremental}", file=sys.stderr)
+        sys.exit()
+
+    journal_file = args.journal or (args.outfile or args.list or args.word) + ".journal"
+    try:
+        journal = Journal(journal_file, args.resume, args.restart)
+    except FileExistsError:
+        sys.exit(
+            f"{journal_file} is from an interrupted run. "
+            "Pass --resume to carry on from it, or --restart to start again"
+        )
+
     if args.word:
         words = [args.word]
+        title = unquote(args.word)
+        sections = scrape_words_comments(
+            words, args.user, args.concurrency, journal=journal
+        )
 
     if args.list:
-        from wordnik_list_scraper import scrape_list, sort_words
+        from wordnik_list_scraper import iter_list, scrape_list_entries
 
-        title, words = scrape_list(args.list)
-        words = sort_words(words)
-
-    comments = []
-
-    print_html_header(args.user, args.list, title, args.subtitle)
-
-    print('<ol class="index">')
-    for word in words:
-        print(f'<li><a href="#{word}">{word}</a>')
-    print("</ol>")
-
-    for word in words:
-        print(f'<div id="{word}">')
-        new_comments = scrape_word_comments(word, args.user)
-        comments.extend(new_comments)
-        for comment in new_comments:
-            print(comment)
-        print("</div>")
+        if wordnik_daemon.client:
+            # The daemon returns the whole list at once
+            title, wordlist = scrape_list_entries(args.list)
+            words, sections = scrape_list_comments(
+                wordlist, args.user, args.concurrency, journal=journal
+            )
+        else:
+            wordlist = iter_list(args.list)
+            words, sections = scrape_list_comments(
+                wordlist, args.user, args.concurrency, journal=journal
+            )
+            title = wordlist.title
 
-    print_html_footer()
+    # Close the sections if writing fails or is interrupted, so the
+    # fetches still queued are cancelled rather than waited for at exit
+    with contextlib.closing(sections), wordnik_output.open_output(args.outfile) as out:
+        if args.format == "jsonl":
+            for word, new_comments in sections:
+                with wordnik_profile.span("render", word=word):
+                    for comment in new_comments:
+                        record = comment_record(word, comment)
+                        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+        else:
+            print_html_header(args.user, args.list, title, args.subtitle, file=out)
+            print_html_index(words, file=out)
+            for word, new_comments in sections:
+                with wordnik_profile.span("render", word=word):
+                    out.write(format_word_section(word, new_comments))
+            print_html_footer(file=out)
 
-#     word_string = '\n'.join(words)
-#     print(word_string)
-#     if not args.outfile:
-#         args.outfile = args.permalink + ".txt"
-#     with open(args.outfile, 'w') as f:
-#         f.write(word_string)
+    # Finished, so no need to resume
+    journal.close(remove=True)
 
 # End of file
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+"""
+Local daemon that keeps the parsers, pooled connections and recent results
+warm between runs of the command-line tools.
+
+Start it with:
+    python wordnik_daemon.py
+
+While it's running, cit.py and the scrapers send their work to it instead of
+doing it themselves. Pass --no-daemon to a tool to skip it.
+
+The daemon fetches with its own --delay, --cache-dir, --offline and so on.
+A tool only uses it when its own fetching options are the same, and it isn't
+profiling, and otherwise warns and does the work itself.
+
+It only answers requests to localhost, and only fetches from Wordnik.
+
+Endpoints, all returning JSON:
+    GET  /ping  with the daemon's fetching options
+    GET  /list?permalink=...&base_url=...&parser=...
+    GET  /comments?word=...&user=...&base_url=...
+    POST /cite  with {"citations": [...], "pos": "n."}
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from urllib.error import HTTPError
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+import wordnik_http
+
+DEFAULT_ADDRESS = os.environ.get("WORDNIK_DAEMON", "127.0.0.1:8765")
+# The only site the daemon fetches from, whatever a request asks for
+WORDNIK_URL = "https://wordnik.com"
+# Host headers the daemon answers, to refuse pages in a browser reaching it
+# by DNS rebinding
+LOCAL_HOSTS = {"127.0.0.1", "localhost", "::1"}
+PING_TIMEOUT = 0.5  # seconds
+CALL_TIMEOUT = 600  # seconds, long enough to scrape a big list
+
+client = None
+
+
+def split_address(address):
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+class DaemonClient:
+    """Call a running daemon. Each call uses its own connection,
+    so a client can be shared between threads"""
+
+    def __init__(self, address=DEFAULT_ADDRESS, timeout=CALL_TIMEOUT):
+        self.host, self.port = split_address(address)
+        self.timeout = timeout
+
+    def _call(self, method, path, params=None, data=None, timeout=None):
+        import http.client
+
+        if params:
+            path += "?" + urlencode(params)
+        body = json.dumps(data).encode("utf-8") if data is not None else None
+        connection = http.client.HTTPConnection(
+            self.host, self.port, timeout=timeout or self.timeout
+        )
+        try:
+            connection.request(
+                method, path, body=body, headers={"Content-Type": "application/json"}
+            )
+            response = connection.getresponse()
+            result = json.loads(response.read())
+        finally:
+            connection.close()
+        if response.status != 200:
+            url = f"http://{self.host}:{self.port}{path}"
+            raise HTTPError(url, response.status, result.get("error"), None, None)
+        return result
+
+    def ping(self):
+        """Return the daemon's status if it is answering, else None"""
+        try:
+            status = self._call("GET", "/ping", timeout=PING_TIMEOUT)
+        except (OSError, ValueError):
+            return None
+        return status if status.get("ok") else None
+
+    def list_entries(self, permalink, base_url, parser):
+        """Return the list's title and a list of (word, metadata) tuples"""
+        result = self._call(
+            "GET",
+            "/list",
+            {"permalink": permalink, "base_url": base_url, "parser": parser},
+        )
+        return result["title"], [tuple(entry) for entry in result["entries"]]
+
+    def word_comments(self, slug, user, base_url):
+        """Return the HTML of each of the word's comments, by user if given"""
+        params = {"word": slug, "base_url": base_url}
+        if user:
+            params["user"] = user
+        return self._call("GET", "/comments", params)["comments"]
+
+    def cite(self, citations, default_pos):
+        """Return the formatted citations"""
+        data = {"citations": citations, "pos": default_pos}
+        return self._call("POST", "/cite", data=data)["texts"]
+
+
+def add_arguments(parser):
+    """Add the options for using the daemon to an argparse parser"""
+    parser.add_argument(
+        "--daemon",
+        default=DEFAULT_ADDRESS,
+        metavar="HOST:PORT",
+        help="Use the daemon at this address if it's running "
+        "(set WORDNIK_DAEMON to change the default)",
+    )
+    parser.add_argument(
+        "--no-daemon", action="store_true", help="Do all the work in this process"
+    )
+
+
+def connect(args):
+    """Set up the daemon client from parsed command-line arguments,
+    if the daemon is running and can do the work as asked.
+    Return the client, or None"""
+    global client
+    client = None
+    if args.no_daemon:
+        return None
+    candidate = DaemonClient(args.daemon)
+    status = candidate.ping()
+    if not status:
+        return None
+
+    reasons = []
+    if getattr(args, "profile", None) or getattr(args, "trace_out", None):
+        reasons.append("profiling")
+    if hasattr(args, "offline"):
+        daemon_settings = status.get("settings") or {}
+        for name, value in wordnik_http.settings(args).items():
+            if daemon_settings.get(name) != value:
+                reasons.append("--" + name.replace("_", "-"))
+    if reasons:
+        print(
+            f"Not using the daemon at {args.daemon}, which fetches with its own "
+            f"options: {', '.join(reasons)} differ. Pass --no-daemon to skip it",
+            file=sys.stderr,
+        )
+        return None
+    client = candidate
+    return client
+
+
+class MemoryCache:
+    """Keep recent results in memory, least recently used first out"""
+
+    def __init__(self, max_entries=1024, max_age=300):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.max_age:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class Daemon:
+    """Serve the scrapers and citation formatting over HTTP on localhost.
+    Use as a context manager to run it in a background thread"""
+
+    def __init__(
+        self, address="127.0.0.1:0", memory=None, settings=None, base_url=WORDNIK_URL
+    ):
+        self.address = split_address(address)
+        self.base_url = base_url
+        self.memory = memory or MemoryCache()
+        # The fetching options it was started with, for clients to check
+        self.settings = settings or wordnik_http.settings()
+        self.requests = 0
+        self._server = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"{host}:{port}"
+
+    def warm_up(self):
+        """Load the parsers, suffix list and citation code now,
+        rather than on the first request"""
+        import bs4  # noqa: F401
+        import cit  # noqa: F401
+        import url_dates  # noqa: F401
+        import url_sources
+        import wordnik_comment_scraper  # noqa: F401
+        import wordnik_list_scraper  # noqa: F401
+
+        url_sources.suffix_extractor()
+
+    def list_entries(self, permalink, base_url, parser):
+        import wordnik_list_scraper
+
+        words = wordnik_list_scraper.iter_list(permalink, base_url, parser)
+        entries = list(words)
+        return {"title": words.title, "entries": entries}
+
+    def word_comments(self, word, user, base_url):
+        import wordnik_comment_scraper
+
+        comments = wordnik_comment_scraper.scrape_word_comments(word, user, base_url)
+        return {"comments": [str(comment) for comment in comments]}
+
+    def cite(self, citations, default_pos):
+        import cit
+
+        cit.fill_from_urls(citations)
+        return {"texts": cit.format_citations(citations, default_pos)}
+
+    def handle(self, method, path, params, data):
+        """Return (status, result) for a request"""
+        if method == "GET" and path == "/ping":
+            return 200, {"ok": True, "settings": self.settings}
+        if method == "POST" and path == "/cite":
+            return 200, self.cite(data["citations"], data.get("pos", "n."))
+
+        import wordnik_list_scraper
+
+        base_url = params.get("base_url", self.base_url)
+        if base_url != self.base_url:
+            return 403, {"error": f"Only fetches from {self.base_url}"}
+        key = (path, tuple(sorted(params.items())))
+        result = self.memory.get(key)
+        if result is not None:
+            return 200, result
+        if method == "GET" and path == "/list":
+            parser = params.get("parser", wordnik_list_scraper.DEFAULT_PARSER)
+            result = self.list_entries(params["permalink"], base_url, parser)
+        elif method == "GET" and path == "/comments":
+            result = self.word_comments(params["word"], params.get("user"), base_url)
+        else:
+            return 404, {"error": "Not found"}
+        self.memory.put(key, result)
+        return 200, result
+
+    def make_server(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                self.respond(None)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                self.respond(json.loads(self.rfile.read(length) or b"null"))
+
+            def respond(self, data):
+                parts = urlsplit(self.path)
+                params = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+                daemon.requests += 1
+                host = urlsplit("//" + self.headers.get("Host", "")).hostname
+                try:
+                    if host not in LOCAL_HOSTS:
+                        status, result = 403, {"error": f"Forbidden host: {host}"}
+                    else:
+                        status, result = daemon.handle(
+                            self.command, parts.path, params, data
+                        )
+                except HTTPError as e:
+                    status, result = e.code, {"error": str(e)}
+                except (KeyError, TypeError) as e:
+                    status, result = 400, {"error": f"Bad request: {e}"}
+                except Exception as e:
+                    status, result = 500, {"error": repr(e)}
+                body = json.dumps(result, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(self.address, Handler)
+        server.daemon_threads = True
+        return server
+
+    def __enter__(self):
+        self._server = self.make_server()
+        threading.Thread(
+            target=self._server.serve_forever, args=(0.05,), daemon=True
+        ).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Keep the Wordnik tools warm in a local daemon.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "-a", "--address", default=DEFAULT_ADDRESS, help="HOST:PORT to listen on"
+    )
+    parser.add_argument(
+        "--memory-size",
+        type=int,
+        default=1024,
+        help="Number of list and word results to keep in memory",
+    )
+    parser.add_argument(
+        "--memory-age",
+        type=float,
+        default=300,
+        help="Seconds to keep list and word results in memory",
+    )
+    wordnik_http.add_arguments(parser)
+    args = parser.parse_args()
+
+    wordnik_http.configure(args)
+
+    # Don't keep results in memory for longer than pages are cached
+    memory = MemoryCache(args.memory_size, min(args.memory_age, args.max_age))
+    daemon = Daemon(args.address, memory, wordnik_http.settings(args))
+    daemon.warm_up()
+    server = daemon.make_server()
+    print(f"Listening on {args.address}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+# End of file
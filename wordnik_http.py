@@ -0,0 +1,504 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+"""
+Shared HTTP fetching for the Wordnik scrapers.
+"""
+import atexit
+import bisect
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from urllib.error import HTTPError
+from urllib.parse import urljoin, urlsplit
+
+import wordnik_profile
+
+# http.client, email.utils and tempfile are imported where they're used,
+# so the command-line tools start quickly
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "wordnik-tools")
+DEFAULT_MAX_AGE = 24 * 60 * 60  # seconds
+DEFAULT_MAX_SIZE = 500 * 1024 * 1024  # bytes
+MAX_REDIRECTS = 5
+USER_AGENT = "wordnik-tools"
+CONNECT_TIMEOUT = 10  # seconds
+READ_TIMEOUT = 30  # seconds
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]  # seconds
+FETCH_OPTIONS = ["delay", "timeout", "retries", "cache_dir", "max_age", "offline"]
+
+
+class OfflineError(Exception):
+    """Raised when a URL is needed in offline mode but isn't cached"""
+
+
+class RateLimiter:
+    """Space out requests to the same host by at least `interval` seconds"""
+
+    def __init__(self, interval=0.0):
+        self.interval = interval
+        self._next_slot = {}
+        self._lock = threading.Lock()
+        # Set by share_limits() to a multiprocessing.Value of the next free
+        # slot for all hosts, shared with other processes
+        self.shared = None
+
+    def wait(self, host):
+        """Block until a request to host is allowed"""
+        if self.shared is not None:
+            with self.shared.get_lock():
+                now = time.monotonic()
+                slot = max(now, self.shared.value)
+                self.shared.value = slot + self.interval
+        else:
+            with self._lock:
+                now = time.monotonic()
+                slot = max(now, self._next_slot.get(host, now))
+                self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class RetryPolicy:
+    """How many times to retry a failed request,
+    with exponential backoff and full jitter between attempts"""
+
+    def __init__(self, retries=4, backoff=0.5, max_backoff=60.0):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def delay(self, attempt, retry_after=None):
+        """Seconds to wait before retry number attempt (from 0), at least
+        as long as the server's Retry-After"""
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+
+class CircuitBreaker:
+    """Pause requests from all threads when the server pushes back:
+    straight away on a 429 Too Many Requests, or after `threshold`
+    failures in a row"""
+
+    def __init__(self, threshold=5, cooldown=30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.trips = 0
+        self._failures = 0
+        self._closed_at = 0.0
+        self._lock = threading.Lock()
+        # Set by share_limits() to a multiprocessing.Value of when the
+        # circuit closes, shared with other processes
+        self.shared = None
+
+    def wait(self):
+        """Block while the circuit is open"""
+        with self._lock:
+            closed_at = self._closed_at
+        if self.shared is not None:
+            closed_at = max(closed_at, self.shared.value)
+        delay = closed_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def success(self):
+        with self._lock:
+            self._failures = 0
+
+    def failure(self, status=None, retry_after=None):
+        with self._lock:
+            self._failures += 1
+            if status == 429 or self._failures >= self.threshold:
+                pause = self.cooldown if retry_after is None else retry_after
+                self._closed_at = max(self._closed_at, time.monotonic() + pause)
+                self._failures = 0
+                self.trips += 1
+                if self.shared is not None:
+                    with self.shared.get_lock():
+                        self.shared.value = max(self.shared.value, self._closed_at)
+
+
+class Stats:
+    """Counts and a latency histogram for the requests made in a run"""
+
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.statuses = {}
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+        self._lock = threading.Lock()
+
+    def record(self, seconds, status):
+        """Record a request's latency and status, or None for network errors"""
+        with self._lock:
+            self.requests += 1
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            self.histogram[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def add(self, retries=0, failures=0):
+        with self._lock:
+            self.retries += retries
+            self.failures += failures
+
+    def report(self, file=None):
+        """Print a summary of the run"""
+        file = file or sys.stderr
+        print(
+            f"HTTP: {self.requests} requests, {self.retries} retries, "
+            f"{self.failures} failures, {breaker.trips} pauses",
+            file=file,
+        )
+        if not self.requests:
+            return
+        statuses = ", ".join(
+            f"{status or 'error'}: {count}"
+            for status, count in sorted(self.statuses.items(), key=str)
+        )
+        print(f"Statuses: {statuses}", file=file)
+        print("Latency:", file=file)
+        labels = [f"<= {bound}s" for bound in LATENCY_BUCKETS] + ["slower"]
+        for label, count in zip(labels, self.histogram):
+            bar = "#" * round(40 * count / self.requests)
+            print(f"  {label:>9} {count:6} {bar}", file=file)
+
+
+def parse_retry_after(value):
+    """Return the seconds to wait from a Retry-After header, or None"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    import email.utils
+
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(when.timestamp() - time.time(), 0.0)
+
+
+class Cache:
+    """On-disk cache of HTTP responses, one file per URL.
+
+    Each file holds a line of JSON metadata (URL, fetch time, validators)
+    followed by the response body. A file's mtime records when it was last
+    used, and the least recently used files are evicted when the total size
+    goes over max_size.
+    """
+
+    def __init__(self, directory, max_age=DEFAULT_MAX_AGE, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_age = max_age
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(size for path, mtime, size in self._entries())
+
+    def _path(self, url):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key + ".cache")
+
+    def _entries(self):
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".cache"):
+                    stat = entry.stat()
+                    yield entry.path, stat.st_mtime, stat.st_size
+
+    def get(self, url):
+        """Return the cached entry for url as a dict, or None"""
+        path = self._path(url)
+        try:
+            with open(path, "rb") as f:
+                meta = json.loads(f.readline())
+                meta["body"] = f.read()
+        except (OSError, ValueError):
+            return None
+        if meta.get("url") != url:
+            return None
+        os.utime(path)
+        return meta
+
+    def is_fresh(self, entry, max_age=None):
+        max_age = self.max_age if max_age is None else max_age
+        return time.time() - entry["fetched"] < max_age
+
+    def put(self, url, body, headers=None):
+        """Store a response body and its validators"""
+        headers = headers or {}
+        meta = {
+            "url": url,
+            "fetched": time.time(),
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+        }
+        import tempfile
+
+        path = self._path(url)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(json.dumps(meta).encode("utf-8") + b"\n")
+            f.write(body)
+        with self._lock:
+            try:
+                self._size -= os.path.getsize(path)
+            except OSError:
+                pass
+            os.replace(tmp_path, path)
+            self._size += os.path.getsize(path)
+            if self._size > self.max_size:
+                self._evict()
+
+    def refresh(self, url, entry):
+        """Mark a revalidated entry as freshly fetched"""
+        self.put(
+            url,
+            entry["body"],
+            {"ETag": entry.get("etag"), "Last-Modified": entry.get("last_modified")},
+        )
+
+    def _evict(self):
+        """Remove least recently used entries until under max_size"""
+        for path, mtime, size in sorted(self._entries(), key=lambda e: e[1]):
+            if self._size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._size -= size
+
+
+class ConnectionPool:
+    """Keep-alive HTTP connections, one per host for each thread,
+    so repeated requests skip the TCP and TLS handshakes"""
+
+    def __init__(self, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._local = threading.local()
+
+    def _connection(self, scheme, netloc):
+        connections = self._local.__dict__.setdefault("connections", {})
+        key = (scheme, netloc)
+        if key not in connections:
+            import http.client
+
+            if scheme == "https":
+                connection_class = http.client.HTTPSConnection
+            else:
+                connection_class = http.client.HTTPConnection
+            connections[key] = connection_class(netloc, timeout=self.connect_timeout)
+        return connections[key]
+
+    def _discard(self, scheme, netloc):
+        connection = self._local.connections.pop((scheme, netloc), None)
+        if connection:
+            connection.close()
+
+    def request(self, method, url, headers=None, body=None):
+        """Make one request and return (status, reason, headers, body)"""
+        import http.client
+
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        headers = dict(headers or {})
+        headers.setdefault("User-Agent", USER_AGENT)
+
+        for attempt in range(2):
+            connection = self._connection(parts.scheme, parts.netloc)
+            reused = connection.sock is not None
+            try:
+                if not reused:
+                    connection.connect()
+                    connection.sock.settimeout(self.read_timeout)
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, OSError):
+                self._discard(parts.scheme, parts.netloc)
+                # Try again if the server closed an idle keep-alive connection
+                if attempt or not reused:
+                    raise
+        if response.will_close:
+            self._discard(parts.scheme, parts.netloc)
+        return response.status, response.reason, response.headers, data
+
+    def get(self, url, headers=None):
+        """GET a URL, following redirects.
+        Return (final URL, status, reason, headers, body)"""
+        for _ in range(MAX_REDIRECTS + 1):
+            status, reason, response_headers, body = self.request("GET", url, headers)
+            location = response_headers.get("Location")
+            if status not in (301, 302, 303, 307, 308) or not location:
+                return url, status, reason, response_headers, body
+            url = urljoin(url, location)
+        raise HTTPError(url, status, "Too many redirects", response_headers, None)
+
+
+rate_limiter = RateLimiter()
+pool = ConnectionPool()
+retry_policy = RetryPolicy()
+breaker = CircuitBreaker()
+stats = Stats()
+cache = None
+offline = False
+
+
+def fetch_with_retries(url, headers=None):
+    """GET a URL through the pool, retrying network errors and retryable
+    statuses. Return (final URL, status, reason, headers, body)"""
+    import http.client
+
+    host = urlsplit(url).netloc
+    for attempt in range(retry_policy.retries + 1):
+        breaker.wait()
+        rate_limiter.wait(host)
+        start = time.monotonic()
+        try:
+            response = pool.get(url, headers)
+        except (http.client.HTTPException, OSError) as e:
+            stats.record(time.monotonic() - start, None)
+            error, status, retry_after = e, None, None
+        else:
+            status = response[1]
+            stats.record(time.monotonic() - start, status)
+            if status not in RETRY_STATUSES:
+                breaker.success()
+                return response
+            error = HTTPError(response[0], status, response[2], response[3], None)
+            retry_after = parse_retry_after(response[3].get("Retry-After"))
+
+        breaker.failure(status, retry_after)
+        if attempt == retry_policy.retries:
+            break
+        stats.add(retries=1)
+        time.sleep(retry_policy.delay(attempt, retry_after))
+
+    stats.add(failures=1)
+    raise error
+
+
+def fetch(url, max_age=None):
+    """Download a URL and return the body as bytes. A cached copy younger
+    than max_age seconds, by default the cache's --max-age, is used without
+    asking the server. With max_age=0, a cached copy is always revalidated
+    with a conditional GET"""
+    with wordnik_profile.span("fetch", url=url):
+        return _fetch(url, max_age)
+
+
+def _fetch(url, max_age=None):
+    entry = cache.get(url) if cache else None
+    if entry and (offline or cache.is_fresh(entry, max_age)):
+        return entry["body"]
+    if offline:
+        raise OfflineError("Not in cache: " + url)
+
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+
+    final_url, status, reason, headers, body = fetch_with_retries(url, headers)
+    if status == 304 and entry:
+        cache.refresh(url, entry)
+        return entry["body"]
+    if status >= 300:
+        stats.add(failures=1)
+        raise HTTPError(final_url, status, reason, headers, None)
+
+    if cache:
+        cache.put(url, body, headers)
+    return body
+
+
+def add_arguments(parser):
+    """Add the shared fetching options to an argparse parser"""
+    parser.add_argument(
+        "--delay",
+        type=float,
+        default=0.25,
+        help="Minimum seconds between starting requests to the same host",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=READ_TIMEOUT,
+        help="Seconds to wait for a response before retrying",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=RetryPolicy().retries,
+        help="Times to retry a request after a network error or 429/5xx",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=DEFAULT_CACHE_DIR,
+        help="Directory for cached pages. Empty to disable caching",
+    )
+    parser.add_argument(
+        "--max-age",
+        type=float,
+        default=DEFAULT_MAX_AGE,
+        help="Seconds before a cached page is revalidated",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Only use cached pages, never the network",
+    )
+
+
+def share_limits(next_slot, closed_at):
+    """Space out requests and pause on a 429 together with other processes
+    given the same multiprocessing.Values, as if they were threads of one.
+    time.monotonic() is system-wide, so its times can be compared between
+    processes"""
+    rate_limiter.shared = next_slot
+    breaker.shared = closed_at
+
+
+def settings(args=None):
+    """Return the fetching options from parsed command-line arguments,
+    or their defaults, as a dict which can be compared between processes"""
+    if args is None:
+        import argparse
+
+        parser = argparse.ArgumentParser()
+        add_arguments(parser)
+        args = parser.parse_args([])
+    result = {name: getattr(args, name) for name in FETCH_OPTIONS}
+    if result["cache_dir"]:
+        result["cache_dir"] = os.path.abspath(result["cache_dir"])
+    return result
+
+
+def configure(args):
+    """Set up fetching from parsed command-line arguments"""
+    global cache, offline
+    rate_limiter.interval = args.delay
+    pool.read_timeout = args.timeout
+    retry_policy.retries = args.retries
+    atexit.register(stats.report)
+    cache = Cache(args.cache_dir, args.max_age) if args.cache_dir else None
+    offline = args.offline
+    if offline and not cache:
+        raise OfflineError("--offline needs a --cache-dir")
+
+
+# End of file
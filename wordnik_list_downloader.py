@@ -7,18 +7,11 @@ so use wordnik_list_scraper.py for others' lists.
 """
 import argparse
 import sys
-import yaml
-from wordnik import swagger, AccountApi, WordListApi
-
-# from pprint import pprint
 
+import wordnik_profile
+from wordnik_sort import sort_words
 
-def get_wordnik_token(username, password):
-    account_api = AccountApi.AccountApi(wordnik_client)
-    result = account_api.authenticate(username, password)
-    token = result.token
-    # print("Your Wordnik token is: " + token)
-    return token
+# from pprint import pprint
 
 
 def load_yaml(filename):
@@ -28,10 +21,12 @@ def load_yaml(filename):
     wordnik_password: TODO_ENTER_YOURS
     wordnik_api_key: TODO_ENTER_YOURS
     """
+    import yaml  # pip install PyYAML
+
     f = open(filename)
     data = yaml.safe_load(f)
     f.close()
-    if not data.viewkeys() >= {
+    if not data.keys() >= {
         "wordnik_username",
         "wordnik_password",
         "wordnik_api_key",
@@ -40,27 +35,6 @@ def load_yaml(filename):
     return data
 
 
-def download_list(permalink, token):
-    """Download a Wordnik list and return a list of words"""
-    results = wordlist_api.getWordListWords(permalink, token)
-    words = []
-    for result in results:
-        words.append(result.word)
-        # print(dir(result))
-        # print("word:\t", result.word)
-        # print("createdAt:\t", result.createdAt)
-        # print("numberCommentsOnWord:\t", result.numberCommentsOnWord)
-        # print("numberLists:\t", result.numberLists)
-        # print("userId:\t", result.userId)
-        # print("username:\t", result.username)
-    return words
-
-
-def sort_words(word_list):
-    """Case-insensitive sort"""
-    return sorted(words, key=lambda s: s.lower())
-
-
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Download a Wordnik list to a text file.",
@@ -80,24 +54,59 @@ if __name__ == "__main__":
     parser.add_argument(
         "-o", "--outfile", help="Save to this file. Default: <permalink>.txt"
     )
+    parser.add_argument(
+        "--lists",
+        nargs="+",
+        default=[],
+        metavar="PERMALINK",
+        help="Also download these lists of yours, each to <permalink>.txt",
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Number of API requests to make in parallel",
+    )
+    parser.add_argument(
+        "--token-cache",
+        help="Reuse the auth token saved in this file. Empty to always log in. "
+        "Default: token.json in the shared cache directory",
+    )
+    wordnik_profile.add_arguments(parser)
     args = parser.parse_args()
+    wordnik_profile.configure(args)
+
+    # Imported here so --help doesn't have to load asyncio
+    import asyncio
+
+    import wordnik_api
+
+    if args.token_cache is None:
+        args.token_cache = wordnik_api.DEFAULT_TOKEN_CACHE
+
+    permalinks = [args.permalink] + args.lists
+    if args.outfile and len(permalinks) > 1:
+        sys.exit("Please give just one list to save to --outfile")
 
     credentials = load_yaml(args.yaml)
-    wordnik_client = swagger.ApiClient(
-        credentials["wordnik_api_key"], "http://api.wordnik.com/v4"
-    )
-    wordlist_api = WordListApi.WordListApi(wordnik_client)
-    token = get_wordnik_token(
-        credentials["wordnik_username"], credentials["wordnik_password"]
+    token_cache = wordnik_api.TokenCache(args.token_cache) if args.token_cache else None
+    lists = asyncio.run(
+        wordnik_api.download(
+            credentials,
+            permalinks,
+            concurrency=args.concurrency,
+            token_cache=token_cache,
+        )
     )
 
-    words = download_list(args.permalink, token)
-    words = sort_words(words)
-    word_string = "\n".join(words)
-    print(word_string)
-    if not args.outfile:
-        args.outfile = args.permalink + ".txt"
-    with open(args.outfile, "w") as f:
-        f.write(word_string.encode("utf-8"))
+    for permalink, words in lists.items():
+        with wordnik_profile.span("render", list=permalink):
+            words = sort_words(words)
+            word_string = "\n".join(words)
+            print(word_string)
+            outfile = args.outfile or permalink + ".txt"
+            with open(outfile, "w", encoding="utf-8") as f:
+                f.write(word_string)
 
 # End of file
@@ -5,24 +5,161 @@ Download a Wordnik list to a text file.
 Scrapes because API only allows access to your own lists.
 """
 import argparse
+import importlib.util
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
 
-from bs4 import BeautifulSoup  # pip install BeautifulSoup4
-from urllib.request import urlopen
+import wordnik_daemon
+import wordnik_http
+import wordnik_output
+import wordnik_profile
+from wordnik_sort import fold as word_key, sort_words
 
-from pprint import pprint
+WORDNIK_URL = "https://wordnik.com"
+PARSERS = ["lxml", "bs4"]
+SET_OPERATIONS = ["diff", "union", "intersect"]
+# Check lxml is installed without importing it, to keep startup quick
+DEFAULT_PARSER = "lxml" if importlib.util.find_spec("lxml") else "bs4"
+CHUNK_SIZE = 64 * 1024
+# Lists change between daily runs, so always ask the server whether a
+# cached list page is still current rather than trusting --max-age
+LIST_MAX_AGE = 0  # seconds
 
 
-def scrape_list(permalink):
-    # """Scrape a Wordnik list and return a list of words"""
-    url = "https://wordnik.com/lists/" + permalink
-    page = urlopen(url)
-    soup = BeautifulSoup(page.read(), "lxml")
+def new_metadata():
+    return {"lists": None, "comments": None, "added_by": None}
+
+
+def update_metadata(metadata, href, text):
+    """Update a list entry's metadata from one of its links"""
+    text = text.strip()
+    if href.endswith("#lists") and metadata["lists"] is None:
+        metadata["lists"] = int(text) if text.isdigit() else None
+    elif href.endswith(("#discuss", "#comments")):
+        metadata["comments"] = int(text) if text.isdigit() else None
+    elif href.startswith("/users/"):
+        metadata["added_by"] = text
+
+
+def word_metadata(li):
+    """Return a dict of the counts and user shown next to a list entry"""
+    metadata = new_metadata()
+    for a in li.find_all("a", href=True):
+        update_metadata(metadata, a["href"], a.get_text())
+    return metadata
+
+
+class ListPageTarget:
+    """lxml parser target which picks the title and entries out of a list
+    page as it is parsed, without building a tree"""
+
+    def __init__(self):
+        self.title = None
+        self.entries = []
+        self.next_href = None
+        self._title_text = None  # list of strings while inside the title
+        self._wordlist_depth = 0  # <ul> nesting inside the word list
+        self._word = None  # first text of the current entry
+        self._word_done = False  # whether a tag has ended the first text
+        self._metadata = None  # metadata of the current entry
+        self._link = None  # [href, text] of the current link in an entry
+
+    def start(self, tag, attrib):
+        if self._title_text is None and self.title is None:
+            if tag == "h1" and attrib.get("id") == "headword":
+                self._title_text = []
+        if tag == "ul":
+            if self._wordlist_depth or attrib.get("id") == "sortable_wordlist":
+                self._wordlist_depth += 1
+        elif tag == "li" and self._wordlist_depth:
+            classes = attrib.get("class", "").split()
+            if "word" in classes and "hidden" not in classes:
+                self._word = ""
+                self._word_done = False
+                self._metadata = new_metadata()
+        elif self._metadata is not None:
+            self._word_done = self._word_done or bool(self._word)
+            if tag == "a" and "href" in attrib:
+                self._link = [attrib["href"], ""]
+        if tag in ("a", "link") and "next" in attrib.get("rel", "").split():
+            self.next_href = self.next_href or attrib.get("href")
+
+    def data(self, text):
+        if self._title_text is not None:
+            self._title_text.append(text)
+        if self._metadata is not None:
+            # lxml splits text at character references, so keep adding to
+            # the word until a tag ends its text, as BeautifulSoup does
+            if not self._word_done:
+                self._word += text
+            if self._link:
+                self._link[1] += text
+
+    def end(self, tag):
+        if self._metadata is not None and tag != "li":
+            self._word_done = self._word_done or bool(self._word)
+        if tag == "h1" and self._title_text is not None:
+            self.title = "".join(self._title_text).strip()
+            self._title_text = None
+        elif tag == "ul" and self._wordlist_depth:
+            self._wordlist_depth -= 1
+        elif tag == "a" and self._link:
+            update_metadata(self._metadata, *self._link)
+            self._link = None
+        elif tag == "li" and self._metadata is not None:
+            self.entries.append((self._word, self._metadata))
+            self._word = self._metadata = None
+
+    def pop_entries(self):
+        """Return and forget the entries found so far"""
+        entries, self.entries = self.entries, []
+        return entries
+
+    def close(self):
+        return self.title, self.entries
+
+
+def feed_list_page(page, target):
+    """Parse a list page in chunks with an lxml target,
+    yielding (word, metadata) tuples as soon as they are found"""
+    from lxml import etree  # pip install lxml
+
+    parser = etree.HTMLParser(target=target, encoding="utf-8")
+    for start in range(0, len(page), CHUNK_SIZE):
+        end = start + CHUNK_SIZE
+        with wordnik_profile.span("parse"):
+            parser.feed(page[start:end])
+        yield from target.pop_entries()
+    with wordnik_profile.span("parse"):
+        parser.close()
+    yield from target.pop_entries()
+
+
+def parse_list_page_lxml(page):
+    """Parse a list page incrementally with an lxml target.
+    Return the title, entries and link to the next page"""
+    target = ListPageTarget()
+    entries = list(feed_list_page(page, target))
+    return target.title, entries, target.next_href
+
+
+def parse_list_page_bs4(page):
+    """Parse a list page by building a full BeautifulSoup tree.
+    Return the title, entries and link to the next page"""
+    from bs4 import BeautifulSoup  # pip install BeautifulSoup4
+
+    soup = BeautifulSoup(page, "lxml")
     wordlist = soup.find(id="sortable_wordlist")
-    words = wordlist.find_all("li", class_="word")
+    words = wordlist.find_all("li", class_="word") if wordlist else []
 
     # <h1 id="headword">Words new to me (2018) <span class="heart_quotes right loveOnly"></span></h1>
 
-    title = soup.find("h1", id="headword").text.strip()
+    headword = soup.find("h1", id="headword")
+    title = headword.text.strip() if headword else None
 
     # <li class="word"><a href="/words/thinhead">thinhead</a>
     #   <span class="popular" style="display:none">and appears on
@@ -36,40 +173,309 @@ def scrape_list(permalink):
     found = []
     for word in words:
         if "hidden" not in word["class"]:
-            found.append(word.find(text=True))
+            found.append((word.find(text=True), word_metadata(word)))
+
+    next_link = soup.find(["a", "link"], rel="next", href=True)
+    return title, found, next_link["href"] if next_link else None
+
+
+def parse_list_page(page, parser=DEFAULT_PARSER):
+    """Return the title and a list of (word, metadata) tuples from a list page"""
+    if parser == "lxml":
+        return parse_list_page_lxml(page)[:2]
+    return parse_list_page_bs4(page)[:2]
+
+
+class ListWords:
+    """Iterate over (word, metadata) for each word on a list, fetching its
+    pages one at a time. "title" is set once the first page is parsed"""
+
+    def __init__(self, permalink, base_url=WORDNIK_URL, parser=DEFAULT_PARSER):
+        self.url = base_url + "/lists/" + permalink
+        self.parser = parser
+        self.title = None
+
+    def __iter__(self):
+        url = self.url
+        seen = set()
+        while url and url not in seen:
+            seen.add(url)
+            page = wordnik_http.fetch(url, max_age=LIST_MAX_AGE)
+            if self.parser == "lxml":
+                target = ListPageTarget()
+                for entry in feed_list_page(page, target):
+                    self.title = self.title or target.title
+                    yield entry
+                title, next_href = target.title, target.next_href
+            else:
+                with wordnik_profile.span("parse", url=url):
+                    title, entries, next_href = parse_list_page_bs4(page)
+                self.title = self.title or title
+                yield from entries
+            self.title = self.title or title
+            url = urljoin(url, next_href) if next_href else None
+
+
+def iter_list(permalink, base_url=WORDNIK_URL, parser=DEFAULT_PARSER):
+    """Return an iterator of (word, metadata) tuples over all pages of a list"""
+    return ListWords(permalink, base_url, parser)
+
+
+def scrape_list_entries(permalink, base_url=WORDNIK_URL, parser=DEFAULT_PARSER):
+    """Scrape a Wordnik list and return its title and a list of
+    (word, metadata) tuples"""
+    with wordnik_profile.span("list", permalink=permalink):
+        if wordnik_daemon.client:
+            return wordnik_daemon.client.list_entries(permalink, base_url, parser)
+        words = iter_list(permalink, base_url, parser)
+        entries = list(words)
+        return words.title, entries
+
+
+def scrape_list(permalink, base_url=WORDNIK_URL, parser=DEFAULT_PARSER):
+    # """Scrape a Wordnik list and return a list of words"""
+    title, entries = scrape_list_entries(permalink, base_url, parser)
+    return title, [word for word, metadata in entries]
+
+
+def scrape_lists(
+    permalinks, concurrency=4, base_url=WORDNIK_URL, parser=DEFAULT_PARSER
+):
+    """Scrape many lists at once, sharing the pooled connections.
+    Yield (permalink, title, entries, seconds taken) in the order given"""
+
+    def scrape(permalink):
+        start = time.perf_counter()
+        title, entries = scrape_list_entries(permalink, base_url, parser)
+        return permalink, title, entries, time.perf_counter() - start
 
-    return title, found
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+        yield from executor.map(scrape, permalinks)
 
 
-def sort_words(word_list):
-    """Case-insensitive sort"""
-    return sorted(word_list, key=lambda s: s.lower())
+def read_permalinks(filename):
+    """Read permalinks from a file, one per line, ignoring # comments"""
+    with open(filename) as f:
+        lines = (line.split("#")[0].strip() for line in f)
+        return [line for line in lines if line]
+
+
+def read_word_file(filename):
+    """Read a list saved by this script. Return its title and words"""
+    title = None
+    words = []
+    with open(filename, encoding="utf-8") as f:
+        first = f.readline()
+        if first.startswith("# "):
+            title = first[2:].strip()
+        elif first.strip():
+            words.append(first.strip())
+        words += [line.strip() for line in f if line.strip()]
+    return title, words
+
+
+def load_words(sources, concurrency=4, base_url=WORDNIK_URL, parser=DEFAULT_PARSER):
+    """Return the words of each source, in order. A source is either a
+    .txt file saved by this script or a list permalink to scrape"""
+    files = {s for s in sources if s.endswith(".txt") and os.path.isfile(s)}
+    permalinks = [s for s in sources if s not in files]
+    scraped = {
+        permalink: [word for word, metadata in entries]
+        for permalink, title, entries, elapsed in scrape_lists(
+            permalinks, concurrency, base_url, parser
+        )
+    }
+    return [read_word_file(s)[1] if s in files else scraped[s] for s in sources]
+
+
+def set_operation(operation, word_lists):
+    """Return the sorted words in the first list but none of the others (diff),
+    in any list (union) or in every list (intersect), ignoring case.
+    Where spellings differ, the first one seen is kept"""
+    first = {}
+    for words in word_lists[: 1 if operation == "diff" else None]:
+        for word in words:
+            first.setdefault(word_key(word), word)
+
+    if operation == "union":
+        keys = first.keys()
+    elif operation == "diff":
+        keys = set(first)
+        for words in word_lists[1:]:
+            keys.difference_update(map(word_key, words))
+    elif operation == "intersect":
+        keys = set(map(word_key, word_lists[0])) if word_lists else set()
+        for words in word_lists[1:]:
+            keys.intersection_update(map(word_key, words))
+    else:
+        raise ValueError(f"Unknown set operation: {operation}")
+    return sort_words(first[key] for key in keys)
+
+
+def set_operation_main(argv):
+    """Command line for diff, union and intersect"""
+    parser = argparse.ArgumentParser(
+        prog="wordnik_list_scraper.py " + argv[0],
+        description={
+            "diff": "Print words in the first list but none of the others.",
+            "union": "Print words in any of the lists.",
+            "intersect": "Print words in all of the lists.",
+        }[argv[0]],
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "lists",
+        nargs="+",
+        metavar="LIST",
+        help="Wordnik permalinks, or .txt files saved by this script",
+    )
+    parser.add_argument("-o", "--outfile", help="Save to this file. Default: stdout")
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Number of lists to scrape in parallel",
+    )
+    parser.add_argument(
+        "--parser",
+        choices=PARSERS,
+        default=DEFAULT_PARSER,
+        help="lxml parses the page as a stream, bs4 builds a full tree",
+    )
+    wordnik_http.add_arguments(parser)
+    wordnik_daemon.add_arguments(parser)
+    wordnik_profile.add_arguments(parser)
+    args = parser.parse_args(argv[1:])
+    if argv[0] == "diff" and len(args.lists) < 2:
+        parser.error("Please give at least two lists to diff")
+
+    wordnik_http.configure(args)
+    wordnik_daemon.connect(args)
+    wordnik_profile.configure(args)
+    word_lists = load_words(args.lists, args.concurrency, parser=args.parser)
+    words = set_operation(argv[0], word_lists)
+    with wordnik_output.open_output(args.outfile) as f:
+        for word in words:
+            f.write(word + "\n")
+    print(f"{argv[0]}: {len(words)} words", file=sys.stderr)
+
+
+def stream_list(words, f):
+    """Write each word from a ListWords to a file as soon as it's scraped,
+    in list order"""
+    header = False
+    for word, metadata in words:
+        if not header:
+            f.write("# " + (words.title or "") + "\n\n")
+            header = True
+        print(word)
+        f.write(word + "\n")
+        f.flush()
+    if not header:
+        f.write("# " + (words.title or "") + "\n\n")
 
 
 if __name__ == "__main__":
+    if sys.argv[1:2] and sys.argv[1] in SET_OPERATIONS:
+        set_operation_main(sys.argv[1:])
+        sys.exit()
+
     parser = argparse.ArgumentParser(
-        description="Download a Wordnik list to a text file.",
+        description="Download Wordnik lists to text files.",
+        epilog="To compare lists instead, run with diff, union or intersect "
+        "followed by permalinks or .txt files. See eg. diff --help",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter,
     )
     parser.add_argument(
         "permalink",
-        help="Wordnik permalink, eg. cutthroats for "
+        nargs="*",
+        help="Wordnik permalinks, eg. cutthroats for "
         "http://wordnik.com/lists/cutthroats",
     )
     parser.add_argument(
-        "-o", "--outfile", help="Save to this file. Default: <permalink>.txt"
+        "-f", "--from-file", help="Also scrape the permalinks in this file"
+    )
+    parser.add_argument(
+        "-o",
+        "--outfile",
+        help="Save to this file, for a single list. Default: <permalink>.txt",
+    )
+    parser.add_argument(
+        "--jsonl", help="Also save every word from every list to this JSONL file"
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Number of lists to scrape in parallel",
     )
+    parser.add_argument(
+        "--parser",
+        choices=PARSERS,
+        default=DEFAULT_PARSER,
+        help="lxml parses the page as a stream, bs4 builds a full tree",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write words as they are scraped, in list order instead of sorted",
+    )
+    wordnik_http.add_arguments(parser)
+    wordnik_daemon.add_arguments(parser)
+    wordnik_profile.add_arguments(parser)
     args = parser.parse_args()
 
-    title, words = scrape_list(args.permalink)
-    print("# " + title + "\n\n")
-    words = sort_words(words)
-    word_string = "\n".join(words)
-    print(word_string)
-    if not args.outfile:
-        args.outfile = args.permalink + ".txt"
-    with open(args.outfile, "w") as f:
-        f.write("# " + title + "\n\n")
-        f.write(word_string)
+    permalinks = args.permalink
+    if args.from_file:
+        permalinks += read_permalinks(args.from_file)
+    if not permalinks:
+        parser.error("Please give at least one permalink")
+    if len(permalinks) > 1 and (args.outfile or args.stream):
+        parser.error("--outfile and --stream only work with a single permalink")
+
+    wordnik_http.configure(args)
+    wordnik_profile.configure(args)
+
+    if args.stream:
+        outfile = args.outfile or permalinks[0] + ".txt"
+        with open(outfile, "w", encoding="utf-8") as f:
+            stream_list(iter_list(permalinks[0], parser=args.parser), f)
+        sys.exit()
+
+    wordnik_daemon.connect(args)
+    start = time.perf_counter()
+    total = 0
+    jsonl = open(args.jsonl, "w", encoding="utf-8") if args.jsonl else None
+    for permalink, title, entries, elapsed in scrape_lists(
+        permalinks, args.concurrency, parser=args.parser
+    ):
+        with wordnik_profile.span("render", permalink=permalink):
+            title = title or ""
+            print("# " + title + "\n\n")
+            words = sort_words(word for word, metadata in entries)
+            word_string = "\n".join(words)
+            print(word_string)
+            outfile = args.outfile or permalink + ".txt"
+            with wordnik_output.atomic_open(outfile) as f:
+                f.write("# " + title + "\n\n")
+                f.write(word_string)
+            if jsonl:
+                for word, metadata in entries:
+                    record = {"list": permalink, "title": title, "word": word}
+                    record.update(metadata)
+                    jsonl.write(json.dumps(record, ensure_ascii=False) + "\n")
+        total += len(entries)
+        print(f"{permalink}: {len(entries)} words in {elapsed:.2f}s", file=sys.stderr)
+    if jsonl:
+        jsonl.close()
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"Total: {len(permalinks)} lists, {total} words in {elapsed:.2f}s "
+        f"({total / elapsed:.0f} words/s)",
+        file=sys.stderr,
+    )
 
 # End of file
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+"""
+Write output files safely: buffered, optionally gzipped, and only renamed
+into place once complete, so a crashed run never leaves a truncated file.
+"""
+import contextlib
+import gzip
+import io
+import os
+import sys
+import tempfile
+
+BUFFER_SIZE = 1024 * 1024  # bytes
+
+
+@contextlib.contextmanager
+def atomic_open(filename, buffer_size=BUFFER_SIZE):
+    """Open a UTF-8 text file for writing through a temporary file in the
+    same directory, renamed over filename only when the with block ends
+    without an exception. Compress with gzip if filename ends with .gz"""
+    directory, basename = os.path.split(os.path.abspath(filename))
+    fd, tmp_filename = tempfile.mkstemp(
+        dir=directory, prefix="." + basename + ".", suffix=".tmp"
+    )
+    try:
+        mode = os.stat(filename).st_mode & 0o777
+    except OSError:
+        mode = 0o644
+    os.chmod(tmp_filename, mode)
+
+    raw = os.fdopen(fd, "wb", buffering=buffer_size)
+    binary = gzip.GzipFile(fileobj=raw, mode="wb") if filename.endswith(".gz") else raw
+    f = io.TextIOWrapper(binary, encoding="utf-8", write_through=False)
+    try:
+        yield f
+        f.detach()
+        if binary is not raw:
+            binary.close()
+        raw.flush()
+        os.fsync(raw.fileno())
+    except BaseException:
+        with contextlib.suppress(Exception):
+            f.detach()
+        raw.close()
+        os.remove(tmp_filename)
+        raise
+    raw.close()
+    os.replace(tmp_filename, filename)
+
+
+def open_output(filename=None):
+    """Return a context manager for writing to filename,
+    or to stdout if no filename or "-" """
+    if not filename or filename == "-":
+        return contextlib.nullcontext(sys.stdout)
+    return atomic_open(filename)
+
+
+# End of file
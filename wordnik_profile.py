@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+"""
+Optional timing of where the tools spend their time.
+
+Code marks its stages with spans:
+
+    with wordnik_profile.span("parse", word=word):
+        ...
+
+Spans are only recorded when a tool is run with --profile or --trace-out.
+Otherwise span() returns a shared do-nothing context manager, so leaving
+them in costs next to nothing.
+
+At exit, a summary table of time per stage is printed. --profile also
+saves cProfile stats, and --trace-out saves a Chrome trace to open in
+chrome://tracing or https://ui.perfetto.dev.
+"""
+import atexit
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+NULL_SPAN = contextlib.nullcontext()
+
+tracer = None
+
+
+class Tracer:
+    """Record named spans of time, from any thread"""
+
+    def __init__(self):
+        self.start = time.perf_counter_ns()
+        self.events = []
+
+    @contextlib.contextmanager
+    def span(self, name, args):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            # list.append is atomic, so no lock is needed
+            self.events.append((name, start, end - start, threading.get_ident(), args))
+
+    def summary(self):
+        """Return (name, count, total seconds, mean ms, max ms) for each
+        stage, longest total first"""
+        stages = {}
+        for name, start, duration, thread, args in self.events:
+            stages.setdefault(name, []).append(duration)
+        rows = [
+            (name, len(d), sum(d) / 1e9, sum(d) / len(d) / 1e6, max(d) / 1e6)
+            for name, d in stages.items()
+        ]
+        return sorted(rows, key=lambda row: row[2], reverse=True)
+
+    def print_summary(self, file=None):
+        file = file or sys.stderr
+        elapsed = (time.perf_counter_ns() - self.start) / 1e9
+        print(f"Profile: {elapsed:.2f}s wall time", file=file)
+        print(
+            f"{'stage':<12} {'count':>8} {'total s':>10} {'mean ms':>10} "
+            f"{'max ms':>10}",
+            file=file,
+        )
+        for name, count, total, mean, longest in self.summary():
+            print(
+                f"{name:<12} {count:>8} {total:>10.3f} {mean:>10.3f} {longest:>10.3f}",
+                file=file,
+            )
+        print("Spans overlap when run in parallel or nested", file=file)
+
+    def chrome_trace(self):
+        """Return the spans in Chrome's trace event format"""
+        pid = os.getpid()
+        threads = {}
+        events = []
+        for name, start, duration, thread, args in self.events:
+            tid = threads.setdefault(thread, len(threads) + 1)
+            events.append(
+                {
+                    "name": name,
+                    "ph": "X",
+                    "ts": (start - self.start) / 1000,
+                    "dur": duration / 1000,
+                    "pid": pid,
+                    "tid": tid,
+                    "args": args,
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def span(name, **args):
+    """Return a context manager timing a stage, with args to show in the trace"""
+    if tracer is None:
+        return NULL_SPAN
+    return tracer.span(name, args)
+
+
+def add_arguments(parser):
+    """Add the profiling options to an argparse parser"""
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="Print time per stage and save cProfile stats to this file. "
+        "cProfile only sees the main thread",
+    )
+    parser.add_argument(
+        "--trace-out",
+        metavar="FILE",
+        help="Print time per stage and save a Chrome trace to this file",
+    )
+
+
+def finish(profiler, profile_file, trace_file):
+    """Stop profiling and save the results"""
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(profile_file)
+    tracer.print_summary()
+    if trace_file:
+        with open(trace_file, "w", encoding="utf-8") as f:
+            json.dump(tracer.chrome_trace(), f)
+
+
+def configure(args):
+    """Start profiling if asked to by parsed command-line arguments"""
+    global tracer
+    if not (args.profile or args.trace_out):
+        return
+    tracer = Tracer()
+    profiler = None
+    if args.profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    atexit.register(finish, profiler, args.profile, args.trace_out)
+
+
+# End of file
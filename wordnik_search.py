@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+"""
+Full-text search over the generated comment pages in output/.
+
+    python wordnik_search.py index
+    python wordnik_search.py query "deep fake"
+
+"index" reads every page, indexes each comment's word, part of speech,
+definition, quote and source into an SQLite FTS5 database, and writes a small
+JSON shard per page for searching in the browser. Only pages which have
+changed since the last run are re-indexed.
+
+"query" takes FTS5 query syntax, eg. word:drop* or "apology tour".
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+
+import wordnik_output
+
+DEFAULT_OUTPUT = "output"
+DB_NAME = "search.sqlite"
+SHARD_DIR = "search"
+TITLE_RE = re.compile(r"<title>(.*?)</title>", re.DOTALL)
+TOKEN_RE = re.compile(r"\w+")
+FIELDS = ["word", "pos", "definition", "source", "quote", "author", "timestamp"]
+# bm25 weights for the indexed columns: word, definition, source, quote, text
+WEIGHTS = (10.0, 3.0, 2.0, 1.0, 1.0)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    name TEXT PRIMARY KEY,
+    title TEXT,
+    fingerprint TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS comments USING fts5(
+    word, definition, source, quote, text,
+    pos UNINDEXED, author UNINDEXED, timestamp UNINDEXED, page UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+def page_entries(html):
+    """Return a dict for each comment on a page, with the word, part of
+    speech, definition, source, quote, author, timestamp and plain text"""
+    from bs4 import BeautifulSoup, SoupStrainer  # pip install BeautifulSoup4
+
+    from wordnik_comment_scraper import comment_record
+
+    soup = BeautifulSoup(html, "lxml", parse_only=SoupStrainer("div", class_="body"))
+    entries = []
+    for body in soup.find_all("div", class_="body", recursive=False):
+        byline = body.find("p", class_="byline")
+        word_link = byline and byline.find("a", href=re.compile("/words/"))
+        if not word_link:
+            continue
+        entry = comment_record(word_link.get_text(), body)
+        entry["pos"] = entry["definition"] = None
+
+        # <p class="body"><b>word</b>, <i>n.</i> A definition</p>
+        first = body.find("p", class_="body")
+        if first and first.b and first.b.get_text() == entry["word"]:
+            entry["pos"] = first.i.get_text(strip=True) if first.i else None
+            for tag in first.find_all(["b", "i"], limit=2):
+                tag.extract()
+            definition = " ".join(first.get_text(" ").split()).lstrip(", ")
+            entry["definition"] = definition or None
+
+        source = body.find("a", rel="nofollow")
+        entry["source"] = " ".join(source.get_text().split()) if source else None
+        quotes = [" ".join(q.get_text().split()) for q in body.find_all("blockquote")]
+        entry["quote"] = "\n".join(quotes) or None
+        del entry["html"]
+        entries.append(entry)
+    return entries
+
+
+def shard(name, title, entries):
+    """Return a page's client-side index: the entries, and a map of each
+    case-folded token to the entries containing it"""
+    index = {}
+    for i, entry in enumerate(entries):
+        text = " ".join(
+            entry[field] or "" for field in ("word", "definition", "source", "quote")
+        )
+        for token in set(TOKEN_RE.findall(text.casefold())):
+            index.setdefault(token, []).append(i)
+    return {
+        "page": name,
+        "title": title,
+        "entries": [{field: entry[field] for field in FIELDS} for entry in entries],
+        "index": index,
+    }
+
+
+def connect(db):
+    connection = sqlite3.connect(db)
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def index_pages(directory=DEFAULT_OUTPUT, db=None, shard_dir=None):
+    """Index the HTML pages in a directory which are new or changed since
+    the last run, and forget pages which have gone.
+    Return the names of the pages indexed"""
+    db = db or os.path.join(directory, DB_NAME)
+    shard_dir = shard_dir or os.path.join(directory, SHARD_DIR)
+    os.makedirs(shard_dir, exist_ok=True)
+    connection = connect(db)
+    known = dict(connection.execute("SELECT name, fingerprint FROM pages"))
+    names = sorted(
+        name
+        for name in os.listdir(directory)
+        if name.endswith(".html") and name != "index.html"
+    )
+
+    indexed = []
+    with connection:
+        for name in set(known) - set(names):
+            connection.execute("DELETE FROM comments WHERE page = ?", (name,))
+            connection.execute("DELETE FROM pages WHERE name = ?", (name,))
+            shard_file = os.path.join(shard_dir, name[: -len(".html")] + ".json")
+            if os.path.exists(shard_file):
+                os.remove(shard_file)
+
+        for name in names:
+            with open(os.path.join(directory, name), "rb") as f:
+                data = f.read()
+            fingerprint = hashlib.sha1(data).hexdigest()
+            if known.get(name) == fingerprint:
+                continue
+
+            html = data.decode("utf-8")
+            match = TITLE_RE.search(html)
+            title = match.group(1).strip() if match else name
+            entries = page_entries(html)
+
+            connection.execute("DELETE FROM comments WHERE page = ?", (name,))
+            connection.executemany(
+                "INSERT INTO comments (word, definition, source, quote, text, "
+                "pos, author, timestamp, page) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        e["word"],
+                        e["definition"],
+                        e["source"],
+                        e["quote"],
+                        e["text"],
+                        e["pos"],
+                        e["author"],
+                        e["timestamp"],
+                        name,
+                    )
+                    for e in entries
+                ],
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?)",
+                (name, title, fingerprint),
+            )
+            shard_file = os.path.join(shard_dir, name[: -len(".html")] + ".json")
+            with wordnik_output.atomic_open(shard_file) as f:
+                json.dump(shard(name, title, entries), f, ensure_ascii=False)
+            indexed.append(name)
+    connection.close()
+    return indexed
+
+
+def quote_terms(query):
+    """Make a query of plain words, for when it isn't valid FTS5 syntax"""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+
+def search(query, directory=DEFAULT_OUTPUT, db=None, limit=20):
+    """Return up to `limit` matching comments, best first, as dicts with
+    the page, word, part of speech, source, date and a highlighted snippet.
+    Raise FileNotFoundError if the pages haven't been indexed"""
+    db = db or os.path.join(directory, DB_NAME)
+    if not os.path.exists(db):
+        raise FileNotFoundError(f"No search index at {db}, run index first")
+    if not query.strip():
+        return []
+    connection = connect(db)
+    sql = f"""
+        SELECT page, word, pos, source, timestamp,
+               snippet(comments, -1, '[', ']', '…', 12)
+        FROM comments
+        WHERE comments MATCH ?
+        ORDER BY bm25(comments, {", ".join(map(str, WEIGHTS))})
+        LIMIT ?
+    """
+    try:
+        rows = connection.execute(sql, (query, limit)).fetchall()
+    except sqlite3.OperationalError:
+        rows = connection.execute(sql, (quote_terms(query), limit)).fetchall()
+    connection.close()
+    keys = ["page", "word", "pos", "source", "timestamp", "snippet"]
+    return [dict(zip(keys, row)) for row in rows]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Search the generated comment pages.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "-d", "--directory", default=DEFAULT_OUTPUT, help="Directory of HTML pages"
+    )
+    parser.add_argument("--db", help=f"Search database. Default: <directory>/{DB_NAME}")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    index_parser = subparsers.add_parser("index", help="Index new and changed pages")
+    index_parser.add_argument(
+        "--shards", help=f"Directory for JSON shards. Default: <directory>/{SHARD_DIR}"
+    )
+    query_parser = subparsers.add_parser("query", help="Search the index")
+    query_parser.add_argument("query", help="Words to find, or an FTS5 query")
+    query_parser.add_argument(
+        "-n", "--limit", type=int, default=20, help="Most results to show"
+    )
+    query_parser.add_argument(
+        "--json", action="store_true", help="Print results as JSON lines"
+    )
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "index":
+        indexed = index_pages(args.directory, args.db, args.shards)
+        for name in indexed:
+            print(name)
+        elapsed = time.perf_counter() - start
+        print(f"Indexed {len(indexed)} pages in {elapsed:.2f}s", file=sys.stderr)
+    else:
+        try:
+            results = search(args.query, args.directory, args.db, args.limit)
+        except FileNotFoundError as e:
+            sys.exit(e)
+        for result in results:
+            if args.json:
+                print(json.dumps(result, ensure_ascii=False))
+            else:
+                pos = f", {result['pos']}" if result["pos"] else ""
+                print(f"{result['word']}{pos} ({result['page']})")
+                print(f"    {result['snippet']}")
+        elapsed = time.perf_counter() - start
+        print(f"{len(results)} results in {elapsed * 1000:.1f} ms", file=sys.stderr)
+
+# End of file
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+"""
+Build the static site in output/ from a manifest of lists.
+
+The manifest (site.json) gives the output directory, the index heading, and
+for each page its list slug, user, title, subtitle and year. Pages are built
+in parallel processes. Each page only re-scrapes words which are new or
+changed on its list, and is only rewritten if its content has changed.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from string import Template
+
+import wordnik_comment_scraper
+import wordnik_http
+import wordnik_output
+
+DEFAULT_MANIFEST = "site.json"
+DEFAULT_JOBS = min(4, os.cpu_count() or 1)
+TITLE_RE = re.compile(r"<title>(.*?)</title>")
+
+INDEX_PAGE = Template(
+    """<!doctype html>
+<html lang="en">
+  <head>
+    <meta charset="utf-8">
+    <meta http-equiv="X-UA-Compatible" content="IE=edge">
+    <title>${title}</title>
+    <meta name="viewport" content="width=device-width, initial-scale=1">
+    <link rel="stylesheet" href="style.css">
+  </head>
+  <body>
+
+    <h1>${heading}</h1>
+
+${groups}  </body>
+</html>
+"""
+)
+INDEX_GROUP = Template(
+    """    <h2>${year}</h2>
+
+    <ol>
+${items}    </ol>
+
+"""
+)
+INDEX_ITEM = Template('      <li><a href="${href}">${user} - ${title}</a>\n')
+
+
+def load_manifest(filename):
+    """Load a site manifest, with the output directory relative to it"""
+    with open(filename, encoding="utf-8") as f:
+        manifest = json.load(f)
+    manifest["output"] = os.path.join(
+        os.path.dirname(filename), manifest.get("output", "output")
+    )
+    return manifest
+
+
+def page_filename(output, page):
+    return os.path.join(output, page["list"] + ".html")
+
+
+def page_title(output, page):
+    """Return the page's title from the manifest, or else from the page"""
+    if page.get("title"):
+        return page["title"]
+    try:
+        with open(page_filename(output, page), encoding="utf-8") as f:
+            match = TITLE_RE.search(f.read(2048))
+    except FileNotFoundError:
+        match = None
+    return match.group(1) if match else page["list"]
+
+
+def render_index(heading, pages):
+    """Return the index page, linking to the pages grouped by year,
+    latest first, in manifest order within each year"""
+    years = {}
+    for page in pages:
+        years.setdefault(page["year"], []).append(page)
+    groups = "".join(
+        INDEX_GROUP.substitute(
+            year=year,
+            items="".join(
+                INDEX_ITEM.substitute(
+                    href=page["list"] + ".html", user=page["user"], title=page["title"]
+                )
+                for page in years[year]
+            ),
+        )
+        for year in sorted(years, reverse=True)
+    )
+    return INDEX_PAGE.substitute(
+        title=heading.replace("<br>", " "), heading=heading, groups=groups
+    )
+
+
+def init_worker(http_args, next_slot=None, closed_at=None):
+    if http_args is not None:
+        wordnik_http.configure(http_args)
+    if next_slot is not None:
+        wordnik_http.share_limits(next_slot, closed_at)
+
+
+def build_page(page, output, concurrency, base_url, refresh_after):
+    """Update one page. Return its slug, the number of words scraped,
+    and whether the page changed"""
+    filename = page_filename(output, page)
+    try:
+        before = os.stat(filename).st_mtime_ns
+    except FileNotFoundError:
+        before = None
+    scraped = wordnik_comment_scraper.update_page(
+        filename,
+        page["list"],
+        page["user"],
+        page.get("subtitle"),
+        concurrency,
+        base_url,
+        title=page.get("title"),
+        refresh_after=refresh_after,
+    )
+    return page["list"], scraped, os.stat(filename).st_mtime_ns != before
+
+
+def build(
+    manifest,
+    jobs=None,
+    concurrency=4,
+    base_url=wordnik_comment_scraper.WORDNIK_URL,
+    http_args=None,
+    only=None,
+    refresh_after=wordnik_comment_scraper.REFRESH_AFTER,
+):
+    """Build the pages in the manifest, or just those for the `only` slugs,
+    `jobs` at a time, then the index.
+    The processes share one rate limit and circuit breaker, and `concurrency`
+    word fetches between them.
+    Yield (slug, words scraped, whether changed) for each page in order,
+    and finally ("index", 0, whether changed)"""
+    jobs = jobs or DEFAULT_JOBS
+    output = manifest["output"]
+    pages = [page for page in manifest["pages"] if not only or page["list"] in only]
+    os.makedirs(output, exist_ok=True)
+
+    if jobs == 1:
+        init_worker(http_args)
+        for page in pages:
+            yield build_page(page, output, concurrency, base_url, refresh_after)
+    else:
+        import multiprocessing
+
+        next_slot = multiprocessing.Value("d", 0.0)
+        closed_at = multiprocessing.Value("d", 0.0)
+        per_page = max(1, concurrency // jobs)
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=init_worker,
+            initargs=(http_args, next_slot, closed_at),
+        ) as executor:
+            futures = [
+                executor.submit(
+                    build_page, page, output, per_page, base_url, refresh_after
+                )
+                for page in pages
+            ]
+            for future in futures:
+                yield future.result()
+
+    filename = os.path.join(output, "index.html")
+    html = render_index(
+        manifest["heading"],
+        [{**page, "title": page_title(output, page)} for page in manifest["pages"]],
+    )
+    try:
+        with open(filename, encoding="utf-8") as f:
+            changed = f.read() != html
+    except FileNotFoundError:
+        changed = True
+    if changed:
+        with wordnik_output.atomic_open(filename) as f:
+            f.write(html)
+    yield "index", 0, changed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build the static site of list pages from a manifest.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "-m", "--manifest", default=DEFAULT_MANIFEST, help="Site manifest"
+    )
+    parser.add_argument(
+        "--only", nargs="+", metavar="SLUG", help="Only build these lists' pages"
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help="Number of pages to build in parallel processes. They share "
+        "one --delay and all pause when one is rate limited",
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Number of word pages to fetch in parallel, in total",
+    )
+    parser.add_argument(
+        "--refresh-after",
+        type=float,
+        default=wordnik_comment_scraper.REFRESH_AFTER / 86400,
+        metavar="DAYS",
+        help="Re-scrape each word once in this many days, a few words each "
+        "run, to pick up new comments. 0 to re-scrape them all",
+    )
+    wordnik_http.add_arguments(parser)
+    args = parser.parse_args()
+
+    manifest = load_manifest(args.manifest)
+    if args.only:
+        unknown = set(args.only) - {page["list"] for page in manifest["pages"]}
+        if unknown:
+            sys.exit("Not in the manifest: " + ", ".join(sorted(unknown)))
+
+    start = time.perf_counter()
+    for slug, scraped, changed in build(
+        manifest,
+        args.jobs,
+        args.concurrency,
+        http_args=args,
+        only=args.only,
+        refresh_after=args.refresh_after * 86400,
+    ):
+        status = "updated" if changed else "unchanged"
+        print(f"{slug}: {status}, {scraped} words scraped", file=sys.stderr)
+    print(f"Built in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+# End of file
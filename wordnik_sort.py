@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+"""
+Sorting and comparing words, shared by the list tools.
+
+Words are compared by a collation key, computed once per word and cached:
+    1. the word with accents removed and case folded, so "Éclair" sorts
+       with "eclair" and before "egg"
+    2. then with accents kept, so "resume" comes before "résumé"
+    3. then the word itself, so the order is always the same
+
+sort_file() sorts files of words too big to sort in memory, by sorting
+chunks into temporary files and merging them.
+"""
+import argparse
+import functools
+import heapq
+import itertools
+import os
+import sys
+import unicodedata
+
+CHUNK_SIZE = 500_000  # words
+KEY_CACHE_SIZE = 1 << 20  # words
+
+
+def _fold(word):
+    return unicodedata.normalize("NFC", word).casefold()
+
+
+@functools.lru_cache(maxsize=KEY_CACHE_SIZE)
+def fold(word):
+    """Return the word normalised and case folded, for comparing words
+    regardless of case"""
+    return _fold(word)
+
+
+@functools.lru_cache(maxsize=KEY_CACHE_SIZE)
+def collation_key(word):
+    """Return the key to sort a word by. The parts are joined with NULs
+    into one string, which compares faster than a tuple"""
+    if word.isascii():
+        folded = word.lower()
+        return f"{folded}\0{folded}\0{word}"
+    folded = _fold(word)
+    base = "".join(
+        c for c in unicodedata.normalize("NFD", folded) if not unicodedata.combining(c)
+    )
+    return f"{base}\0{folded}\0{word}"
+
+
+def sort_words(word_list):
+    """Sort words, ignoring case and then accents"""
+    return sorted(word_list, key=collation_key)
+
+
+def _write_chunk(words, directory):
+    import tempfile
+
+    f = tempfile.TemporaryFile("w+", encoding="utf-8", dir=directory)
+    f.writelines(word + "\n" for word in sort_words(words))
+    f.seek(0)
+    return f
+
+
+def sort_lines(lines, chunk_size=CHUNK_SIZE, directory=None):
+    """Yield the words from an iterable of lines in sorted order, holding no
+    more than chunk_size words in memory at once. Blank lines are dropped"""
+    words = (line.rstrip("\n") for line in lines)
+    words = (word for word in words if word)
+    chunk = list(itertools.islice(words, chunk_size))
+    rest = list(itertools.islice(words, chunk_size))
+    if not rest:
+        # Fits in memory
+        yield from sort_words(chunk)
+        return
+
+    chunks = [_write_chunk(chunk, directory), _write_chunk(rest, directory)]
+    try:
+        while True:
+            chunk = list(itertools.islice(words, chunk_size))
+            if not chunk:
+                break
+            chunks.append(_write_chunk(chunk, directory))
+        merged = heapq.merge(
+            *((line.rstrip("\n") for line in f) for f in chunks), key=collation_key
+        )
+        yield from merged
+    finally:
+        for f in chunks:
+            f.close()
+
+
+def sort_file(infile, outfile, chunk_size=CHUNK_SIZE):
+    """Sort a file of words, one per line, into another file"""
+    import wordnik_output
+
+    directory = os.path.dirname(os.path.abspath(outfile))
+    with open(infile, encoding="utf-8") as f_in:
+        with wordnik_output.atomic_open(outfile) as f_out:
+            for word in sort_lines(f_in, chunk_size, directory):
+                f_out.write(word + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Sort a file of words, even one too big for memory.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("infile", help="File of words, one per line")
+    parser.add_argument("-o", "--outfile", help="Sorted output. Default: stdout")
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=CHUNK_SIZE,
+        help="Words to sort in memory at once",
+    )
+    args = parser.parse_args()
+
+    if args.outfile:
+        sort_file(args.infile, args.outfile, args.chunk_size)
+    else:
+        with open(args.infile, encoding="utf-8") as f:
+            for word in sort_lines(f, args.chunk_size):
+                sys.stdout.write(word + "\n")
+
+# End of file